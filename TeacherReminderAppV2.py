@@ -1,17 +1,26 @@
+import time
+STARTED_AT = time.perf_counter()
+import sys
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import sqlite3
 from datetime import datetime, timedelta
-import threading
-import time
-from plyer import notification
-import json
-import winsound
-import platform
+from reminder_delivery import (DIGEST_QUEUE_WAIT_SECONDS, DigestCoalescer, NotificationDispatcher,
+                               format_digest, play_alert, show_notification)
+from reminder_metrics import Instrumentation
+from reminder_scheduler import ReminderNotifier
+from reminder_db import (ConnectionManager, SettingsCache, get_dashboard_counts, get_occurrences,
+                         get_reminders_page, migrate_counters, migrate_occurrences,
+                         migrate_reminders, migrate_search, search_reminders)
+from reminder_widgets import PagedTreeview, ViewRegistry, report_startup_time
+
+# Each user gets at most one notification per window; the rest are merged
+DIGEST_WINDOW_SECONDS = 60
 
 class TeacherReminderSystem:
-    def __init__(self, root):
+    def __init__(self, root, metrics=None):
         self.root = root
+        self.metrics = metrics
         self.root.title("Automated Teacher Reminder System")
         self.root.geometry("1000x700")
         self.root.configure(bg="#f0f0f0")
@@ -22,60 +31,88 @@ class TeacherReminderSystem:
         # Current user
         self.current_user = None
         
-        # Start notification checker thread
-        self.running = True
-        self.notification_thread = threading.Thread(target=self.check_reminders, daemon=True)
-        self.notification_thread.start()
+        # Every user's settings, so notifications never query them
+        self.settings = SettingsCache(self.db)
+        self.settings.load()
+        
+        # Sounds and desktop notifications run on worker threads
+        self.dispatcher = NotificationDispatcher()
+        self.dispatcher.start()
+        self.digests = DigestCoalescer(self.notify_reminders, window_seconds=DIGEST_WINDOW_SECONDS)
+        
+        # Start notification checker thread for every user's reminders
+        self.notifier = ReminderNotifier(self.db, self.deliver_reminders)
+        self.notifier.start()
         
         # Show login screen
         self.show_login_screen()
     
     def init_database(self):
         """Initialize SQLite database with required tables"""
-        self.conn = sqlite3.connect('teacher_reminders.db', check_same_thread=False)
-        self.cursor = self.conn.cursor()
-        
-        # Users table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                full_name TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Reminders table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reminders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                title TEXT NOT NULL,
-                description TEXT,
-                reminder_date DATE NOT NULL,
-                reminder_time TIME NOT NULL,
-                category TEXT,
-                status TEXT DEFAULT 'pending',
-                repeat_type TEXT DEFAULT 'once',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                notified INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Settings table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                user_id INTEGER PRIMARY KEY,
-                theme TEXT DEFAULT 'light',
-                notification_sound INTEGER DEFAULT 1,
-                email_notifications INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        self.conn.commit()
+        self.db = ConnectionManager('teacher_reminders.db', metrics=self.metrics)
+        
+        with self.db.transaction() as cursor:
+            # Users table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL,
+                    full_name TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Reminders table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS reminders (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    reminder_date DATE NOT NULL,
+                    reminder_time TIME NOT NULL,
+                    category TEXT,
+                    status TEXT DEFAULT 'pending',
+                    repeat_type TEXT DEFAULT 'once',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    notified INTEGER DEFAULT 0,
+                    due_at INTEGER,
+                    series_start TEXT,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            ''')
+            
+            # Settings table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS settings (
+                    user_id INTEGER PRIMARY KEY,
+                    theme TEXT DEFAULT 'light',
+                    notification_sound INTEGER DEFAULT 1,
+                    email_notifications INTEGER DEFAULT 0,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            ''')
+            
+            # Migrate existing database - add due_at column if it doesn't exist
+            self.migrate_database(cursor)
+    
+    def migrate_database(self, cursor):
+        """Add new columns to existing database if they don't exist"""
+        try:
+            # Add the indexed due_at timestamp used by the checker and dashboard
+            migrate_reminders(cursor)
+            
+            # Add the trigger-maintained dashboard counters
+            migrate_counters(cursor)
+            
+            # Add the occurrence index behind calendar range queries
+            migrate_occurrences(cursor)
+            
+            # Add the full-text index behind the reminders search box
+            migrate_search(cursor)
+        except Exception as e:
+            print(f"Migration error: {e}")
     
     def show_login_screen(self):
         """Display login interface"""
@@ -163,13 +200,13 @@ class TeacherReminderSystem:
             return
         
         try:
-            self.cursor.execute("INSERT INTO users (username, password, full_name) VALUES (?, ?, ?)",
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT INTO users (username, password, full_name) VALUES (?, ?, ?)",
                               (username, password, full_name))
-            user_id = self.cursor.lastrowid
-            
-            # Create default settings
-            self.cursor.execute("INSERT INTO settings (user_id) VALUES (?)", (user_id,))
-            self.conn.commit()
+                user_id = cursor.lastrowid
+                
+                # Create default settings
+                cursor.execute("INSERT INTO settings (user_id) VALUES (?)", (user_id,))
             
             messagebox.showinfo("Success", "Account created successfully!")
             self.show_login_screen()
@@ -185,12 +222,12 @@ class TeacherReminderSystem:
             messagebox.showerror("Error", "Please enter username and password!")
             return
         
-        self.cursor.execute("SELECT id, full_name FROM users WHERE username=? AND password=?",
-                          (username, password))
-        result = self.cursor.fetchone()
+        result = self.db.query_one("SELECT id, full_name FROM users WHERE username=? AND password=?",
+                                   (username, password))
         
         if result:
             self.current_user = {"id": result[0], "name": result[1], "username": username}
+            self.settings.load(result[0])
             self.show_main_screen()
         else:
             messagebox.showerror("Error", "Invalid username or password!")
@@ -234,87 +271,99 @@ class TeacherReminderSystem:
         self.content_frame = tk.Frame(self.root, bg="#ecf0f1")
         self.content_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
         
+        # Screens are built on first visit and only refreshed afterwards
+        self.views = ViewRegistry(self.content_frame, metrics=self.metrics)
+        self.views.register("dashboard", self.build_dashboard)
+        self.views.register("add_reminder", self.build_add_reminder)
+        self.views.register("reminders", self.build_reminders)
+        self.views.register("task_log", self.build_task_log)
+        self.views.register("settings", self.build_settings)
+        
         # Show dashboard by default
         self.show_dashboard()
     
     def show_dashboard(self):
         """Display dashboard with statistics"""
-        self.clear_content()
-        
-        tk.Label(self.content_frame, text="Dashboard", 
+        self.views.show("dashboard")
+    
+    def build_dashboard(self, frame):
+        """Build the dashboard screen and return its refresh function"""
+        tk.Label(frame, text="Dashboard", 
                 font=("Arial", 24, "bold"), bg="#ecf0f1").pack(pady=20)
         
         # Statistics
-        stats_frame = tk.Frame(self.content_frame, bg="#ecf0f1")
+        stats_frame = tk.Frame(frame, bg="#ecf0f1")
         stats_frame.pack(pady=20)
         
-        # Get statistics
-        self.cursor.execute("SELECT COUNT(*) FROM reminders WHERE user_id=? AND status='pending'",
-                          (self.current_user['id'],))
-        pending = self.cursor.fetchone()[0]
-        
-        self.cursor.execute("SELECT COUNT(*) FROM reminders WHERE user_id=? AND status='completed'",
-                          (self.current_user['id'],))
-        completed = self.cursor.fetchone()[0]
-        
-        self.cursor.execute("SELECT COUNT(*) FROM reminders WHERE user_id=? AND reminder_date=?",
-                          (self.current_user['id'], datetime.now().strftime('%Y-%m-%d')))
-        today = self.cursor.fetchone()[0]
-        
         # Stat cards
         stats = [
-            ("Pending Tasks", pending, "#e74c3c"),
-            ("Completed Tasks", completed, "#2ecc71"),
-            ("Today's Reminders", today, "#3498db")
+            ("Pending Tasks", "#e74c3c"),
+            ("Completed Tasks", "#2ecc71"),
+            ("Today's Reminders", "#3498db")
         ]
         
-        for i, (label, value, color) in enumerate(stats):
+        value_labels = []
+        for i, (label, color) in enumerate(stats):
             card = tk.Frame(stats_frame, bg=color, width=200, height=120, relief=tk.RAISED, bd=2)
             card.grid(row=0, column=i, padx=20, pady=10)
             card.pack_propagate(False)
             
-            tk.Label(card, text=str(value), font=("Arial", 36, "bold"), 
-                    bg=color, fg="white").pack(pady=10)
+            value_label = tk.Label(card, text="0", font=("Arial", 36, "bold"), 
+                                   bg=color, fg="white")
+            value_label.pack(pady=10)
+            value_labels.append(value_label)
             tk.Label(card, text=label, font=("Arial", 12), 
                     bg=color, fg="white").pack()
         
         # Upcoming reminders
-        upcoming_frame = tk.LabelFrame(self.content_frame, text="Upcoming Reminders", 
+        upcoming_frame = tk.LabelFrame(frame, text="Upcoming Reminders", 
                                       font=("Arial", 14, "bold"), bg="#ecf0f1", padx=20, pady=10)
         upcoming_frame.pack(pady=20, padx=40, fill=tk.BOTH, expand=True)
         
-        self.cursor.execute("""
-            SELECT title, reminder_date, reminder_time, category 
-            FROM reminders 
-            WHERE user_id=? AND status='pending' AND datetime(reminder_date || ' ' || reminder_time) >= datetime('now')
-            ORDER BY reminder_date, reminder_time 
-            LIMIT 5
-        """, (self.current_user['id'],))
-        
-        upcoming = self.cursor.fetchall()
+        def refresh():
+            # Get statistics
+            counts = get_dashboard_counts(self.db, self.current_user['id'],
+                                          datetime.now().strftime('%Y-%m-%d'))
+            for value_label, value in zip(value_labels, counts):
+                value_label.config(text=str(value))
+            
+            upcoming = self.db.query("""
+                SELECT title, reminder_date, reminder_time, category 
+                FROM reminders 
+                WHERE user_id=? AND status='pending' AND notified=0 AND due_at >= ?
+                ORDER BY due_at 
+                LIMIT 5
+            """, (self.current_user['id'], int(time.time())))
+            
+            for widget in upcoming_frame.winfo_children():
+                widget.destroy()
+            
+            if upcoming:
+                for reminder in upcoming:
+                    reminder_frame = tk.Frame(upcoming_frame, bg="white", relief=tk.RAISED, bd=1)
+                    reminder_frame.pack(fill=tk.X, pady=5)
+                    
+                    tk.Label(reminder_frame, text=reminder[0], font=("Arial", 12, "bold"),
+                            bg="white", anchor="w").pack(side=tk.LEFT, padx=10, pady=5)
+                    
+                    tk.Label(reminder_frame, text=f"{reminder[1]} at {reminder[2]}", 
+                            font=("Arial", 10), bg="white", fg="#7f8c8d").pack(side=tk.RIGHT, padx=10)
+            else:
+                tk.Label(upcoming_frame, text="No upcoming reminders", 
+                        font=("Arial", 12), bg="#ecf0f1", fg="#7f8c8d").pack(pady=20)
         
-        if upcoming:
-            for reminder in upcoming:
-                reminder_frame = tk.Frame(upcoming_frame, bg="white", relief=tk.RAISED, bd=1)
-                reminder_frame.pack(fill=tk.X, pady=5)
-                
-                tk.Label(reminder_frame, text=reminder[0], font=("Arial", 12, "bold"),
-                        bg="white", anchor="w").pack(side=tk.LEFT, padx=10, pady=5)
-                
-                tk.Label(reminder_frame, text=f"{reminder[1]} at {reminder[2]}", 
-                        font=("Arial", 10), bg="white", fg="#7f8c8d").pack(side=tk.RIGHT, padx=10)
-        else:
-            tk.Label(upcoming_frame, text="No upcoming reminders", 
-                    font=("Arial", 12), bg="#ecf0f1", fg="#7f8c8d").pack(pady=20)
+        return refresh
     
     def show_add_reminder(self):
         """Display add reminder form"""
-        self.clear_content()
-        
-        tk.Label(self.content_frame, text="Add New Reminder", 
+        self.views.show("add_reminder")
+    
+    def build_add_reminder(self, frame):
+        """Build the add reminder form and return its reset function"""
+        tk.Label(frame, text="Add New Reminder", 
                 font=("Arial", 24, "bold"), bg="#ecf0f1").pack(pady=20)
         
-        form_frame = tk.Frame(self.content_frame, bg="white", relief=tk.RAISED, bd=2)
+        form_frame = tk.Frame(frame, bg="white", relief=tk.RAISED, bd=2)
         form_frame.pack(pady=20, padx=100)
         
         # Title
@@ -330,13 +379,11 @@ class TeacherReminderSystem:
         # Date
         tk.Label(form_frame, text="Date (YYYY-MM-DD):", font=("Arial", 12), bg="white").grid(row=2, column=0, sticky="w", padx=20, pady=10)
         date_entry = tk.Entry(form_frame, font=("Arial", 12), width=40)
-        date_entry.insert(0, datetime.now().strftime('%Y-%m-%d'))
         date_entry.grid(row=2, column=1, padx=20, pady=10)
         
         # Time
         tk.Label(form_frame, text="Time (HH:MM):", font=("Arial", 12), bg="white").grid(row=3, column=0, sticky="w", padx=20, pady=10)
         time_entry = tk.Entry(form_frame, font=("Arial", 12), width=40)
-        time_entry.insert(0, "09:00")
         time_entry.grid(row=3, column=1, padx=20, pady=10)
         
         # Category
@@ -357,47 +404,55 @@ class TeacherReminderSystem:
         
         # Save button
         def save_reminder():
-            title = title_entry.get().strip()
-            description = desc_text.get("1.0", tk.END).strip()
-            date = date_entry.get().strip()
-            time_val = time_entry.get().strip()
-            category = category_var.get()
-            repeat = repeat_var.get()
-            
-            if not title or not date or not time_val:
-                messagebox.showerror("Error", "Title, date, and time are required!")
+            # The import/export module is only loaded once it is needed
+            from reminder_io import validate_reminder
+            try:
+                # Same checks as the bulk importer
+                row = validate_reminder(title_entry.get(), desc_text.get("1.0", tk.END), date_entry.get(),
+                                        time_entry.get(), category_var.get(), repeat_var.get())
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
                 return
             
-            try:
-                # Validate date and time
-                datetime.strptime(date, '%Y-%m-%d')
-                datetime.strptime(time_val, '%H:%M')
-                
-                self.cursor.execute("""
+            with self.db.transaction() as cursor:
+                cursor.execute("""
                     INSERT INTO reminders (user_id, title, description, reminder_date, 
-                                         reminder_time, category, repeat_type)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (self.current_user['id'], title, description, date, time_val, category, repeat))
-                self.conn.commit()
-                
-                messagebox.showinfo("Success", "Reminder added successfully!")
-                self.show_reminders()
-            except ValueError:
-                messagebox.showerror("Error", "Invalid date or time format!")
+                                         reminder_time, category, repeat_type, due_at, series_start)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (self.current_user['id'],) + row)
+                reminder_id = cursor.lastrowid
+            self.notifier.schedule(reminder_id, row[6])
+            
+            messagebox.showinfo("Success", "Reminder added successfully!")
+            self.show_reminders()
         
         tk.Button(form_frame, text="Save Reminder", command=save_reminder,
                  bg="#2ecc71", fg="white", font=("Arial", 14, "bold"),
                  cursor="hand2", width=20).grid(row=6, column=0, columnspan=2, pady=20)
+        
+        def reset_form():
+            title_entry.delete(0, tk.END)
+            desc_text.delete("1.0", tk.END)
+            date_entry.delete(0, tk.END)
+            date_entry.insert(0, datetime.now().strftime('%Y-%m-%d'))
+            time_entry.delete(0, tk.END)
+            time_entry.insert(0, "09:00")
+            category_var.set("Class")
+            repeat_var.set("once")
+        
+        return reset_form
     
     def show_reminders(self):
         """Display all reminders"""
-        self.clear_content()
-        
-        tk.Label(self.content_frame, text="All Reminders", 
+        self.views.show("reminders")
+    
+    def build_reminders(self, frame):
+        """Build the reminders list screen and return its refresh function"""
+        tk.Label(frame, text="All Reminders", 
                 font=("Arial", 24, "bold"), bg="#ecf0f1").pack(pady=20)
         
         # Filter frame
-        filter_frame = tk.Frame(self.content_frame, bg="#ecf0f1")
+        filter_frame = tk.Frame(frame, bg="#ecf0f1")
         filter_frame.pack(pady=10)
         
         tk.Label(filter_frame, text="Filter:", font=("Arial", 12), bg="#ecf0f1").pack(side=tk.LEFT, padx=5)
@@ -410,8 +465,28 @@ class TeacherReminderSystem:
                           bg="#ecf0f1", font=("Arial", 10), 
                           command=lambda: self.update_reminders_list(tree, filter_var.get())).pack(side=tk.LEFT, padx=5)
         
+        # Search box: ranked full-text matches replace the list until cleared
+        tk.Label(filter_frame, text="Search:", font=("Arial", 12), bg="#ecf0f1").pack(side=tk.LEFT, padx=(20, 5))
+        
+        search_entry = tk.Entry(filter_frame, font=("Arial", 11), width=25)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", lambda event: self.search_reminders_list(search_entry.get()))
+        
+        def clear_search():
+            search_entry.delete(0, tk.END)
+            self.search_reminders_list("")
+        
+        tk.Button(filter_frame, text="Search", 
+                 command=lambda: self.search_reminders_list(search_entry.get()),
+                 bg="#3498db", fg="white", font=("Arial", 10),
+                 cursor="hand2").pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(filter_frame, text="Clear", command=clear_search,
+                 bg="#95a5a6", fg="white", font=("Arial", 10),
+                 cursor="hand2").pack(side=tk.LEFT, padx=5)
+        
         # Treeview frame
-        tree_frame = tk.Frame(self.content_frame, bg="white")
+        tree_frame = tk.Frame(frame, bg="white")
         tree_frame.pack(pady=10, padx=40, fill=tk.BOTH, expand=True)
         
         # Scrollbar
@@ -430,11 +505,16 @@ class TeacherReminderSystem:
         tree.pack(fill=tk.BOTH, expand=True)
         scrollbar.config(command=tree.yview)
         
-        # Load reminders
+        # Load reminders a page at a time as the list is scrolled
+        self.reminder_pages = PagedTreeview(tree, self.fetch_reminders_page,
+                                            key_of=lambda row: (row[2], row[3], row[0]),
+                                            iid_of=lambda row: str(row[0]),
+                                            scrollbar=scrollbar)
+        self.reminder_search = ""
         self.update_reminders_list(tree, "all")
         
         # Action buttons
-        btn_frame = tk.Frame(self.content_frame, bg="#ecf0f1")
+        btn_frame = tk.Frame(frame, bg="#ecf0f1")
         btn_frame.pack(pady=10)
         
         tk.Button(btn_frame, text="Mark Complete", 
@@ -446,29 +526,43 @@ class TeacherReminderSystem:
                  command=lambda: self.delete_reminder(tree),
                  bg="#e74c3c", fg="white", font=("Arial", 11),
                  cursor="hand2").pack(side=tk.LEFT, padx=5)
-    
-    def update_reminders_list(self, tree, filter_status):
-        """Update reminders list based on filter"""
-        for item in tree.get_children():
-            tree.delete(item)
         
-        if filter_status == "all":
-            self.cursor.execute("""
-                SELECT id, title, reminder_date, reminder_time, category, status 
-                FROM reminders WHERE user_id=? 
-                ORDER BY reminder_date DESC, reminder_time DESC
-            """, (self.current_user['id'],))
-        else:
-            self.cursor.execute("""
-                SELECT id, title, reminder_date, reminder_time, category, status 
-                FROM reminders WHERE user_id=? AND status=? 
-                ORDER BY reminder_date DESC, reminder_time DESC
-            """, (self.current_user['id'], filter_status))
+        tk.Button(btn_frame, text="Import...", 
+                 command=self.import_reminders_file,
+                 bg="#3498db", fg="white", font=("Arial", 11),
+                 cursor="hand2").pack(side=tk.LEFT, padx=5)
         
-        reminders = self.cursor.fetchall()
+        tk.Button(btn_frame, text="Export...", 
+                 command=self.export_reminders_file,
+                 bg="#3498db", fg="white", font=("Arial", 11),
+                 cursor="hand2").pack(side=tk.LEFT, padx=5)
         
-        for reminder in reminders:
-            tree.insert("", tk.END, values=reminder)
+        return self.reminder_pages.refresh
+    
+    def update_reminders_list(self, tree, filter_status):
+        """Update reminders list based on filter"""
+        self.reminder_filter = filter_status
+        self.reminder_pages.reset()
+    
+    def search_reminders_list(self, text):
+        """Show reminders matching text, best matches first; empty text shows the full list"""
+        self.reminder_search = text.strip()
+        self.reminder_pages.reset()
+    
+    def get_reminders_between(self, start, end):
+        """Return the current user's reminder occurrences from start up to end"""
+        rows = get_occurrences(self.db, self.current_user['id'], int(start.timestamp()), int(end.timestamp()))
+        return [(datetime.fromtimestamp(row[0]),) + tuple(row[1:]) for row in rows]
+    
+    def fetch_reminders_page(self, key, limit, forward):
+        """Fetch one keyset page of the current user's reminders"""
+        status = None if self.reminder_filter == "all" else self.reminder_filter
+        if self.reminder_search:
+            # Ranked results are not in keyset order, so they come as one page
+            if key is not None:
+                return []
+            return search_reminders(self.db, self.current_user['id'], self.reminder_search, status, limit)
+        return get_reminders_page(self.db, self.current_user['id'], status, key, limit, forward)
     
     def mark_complete(self, tree):
         """Mark selected reminder as complete"""
@@ -480,11 +574,17 @@ class TeacherReminderSystem:
         item = tree.item(selected[0])
         reminder_id = item['values'][0]
         
-        self.cursor.execute("UPDATE reminders SET status='completed' WHERE id=?", (reminder_id,))
-        self.conn.commit()
+        self.db.execute("UPDATE reminders SET status='completed' WHERE id=?", (reminder_id,))
+        self.notifier.cancel(reminder_id)
         
         messagebox.showinfo("Success", "Reminder marked as complete!")
-        self.update_reminders_list(tree, "all")
+        
+        # Update only this row and keep the active filter
+        if self.reminder_filter == "pending":
+            self.reminder_pages.remove_row(selected[0])
+        else:
+            row = self.reminder_pages.rows[selected[0]]
+            self.reminder_pages.update_row(row[:5] + ('completed',))
     
     def delete_reminder(self, tree):
         """Delete selected reminder"""
@@ -497,21 +597,63 @@ class TeacherReminderSystem:
             item = tree.item(selected[0])
             reminder_id = item['values'][0]
             
-            self.cursor.execute("DELETE FROM reminders WHERE id=?", (reminder_id,))
-            self.conn.commit()
+            self.db.execute("DELETE FROM reminders WHERE id=?", (reminder_id,))
+            self.notifier.cancel(reminder_id)
             
             messagebox.showinfo("Success", "Reminder deleted!")
-            self.update_reminders_list(tree, "all")
+            self.reminder_pages.remove_row(selected[0])
+    
+    def import_reminders_file(self):
+        """Bulk import reminders from a CSV, JSON Lines or iCalendar file"""
+        path = filedialog.askopenfilename(
+            title="Import reminders",
+            filetypes=[("Reminder files", "*.csv *.jsonl *.ndjson *.ics"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        from reminder_io import import_reminders, read_reminders
+        try:
+            imported, rejected, errors = import_reminders(self.db, self.current_user['id'], read_reminders(path))
+        except Exception as e:
+            messagebox.showerror("Error", f"Import failed: {e}")
+            return
+        
+        self.notifier.load()
+        self.reminder_pages.refresh()
+        
+        message = f"Imported {imported} reminders."
+        if rejected:
+            message += f"\n\nSkipped {rejected} invalid rows:\n"
+            message += "\n".join(f"Line {line_number}: {error}" for line_number, error in errors[:5])
+        messagebox.showinfo("Import", message)
+    
+    def export_reminders_file(self):
+        """Export the current user's reminders and their status to a file"""
+        path = filedialog.asksaveasfilename(
+            title="Export reminders", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("iCalendar", "*.ics")])
+        if not path:
+            return
+        
+        from reminder_io import export_reminders
+        try:
+            count = export_reminders(self.db, path, self.current_user['id'])
+        except Exception as e:
+            messagebox.showerror("Error", f"Export failed: {e}")
+            return
+        messagebox.showinfo("Export", f"Exported {count} reminders.")
     
     def show_task_log(self):
         """Display task log"""
-        self.clear_content()
-        
-        tk.Label(self.content_frame, text="Task Log", 
+        self.views.show("task_log")
+    
+    def build_task_log(self, frame):
+        """Build the task log screen and return its refresh function"""
+        tk.Label(frame, text="Task Log", 
                 font=("Arial", 24, "bold"), bg="#ecf0f1").pack(pady=20)
         
         # Log frame
-        log_frame = tk.Frame(self.content_frame, bg="white", relief=tk.RAISED, bd=2)
+        log_frame = tk.Frame(frame, bg="white", relief=tk.RAISED, bd=2)
         log_frame.pack(pady=20, padx=40, fill=tk.BOTH, expand=True)
         
         # Text widget for log
@@ -519,50 +661,46 @@ class TeacherReminderSystem:
                           bg="#2c3e50", fg="#ecf0f1", padx=10, pady=10)
         log_text.pack(fill=tk.BOTH, expand=True)
         
-        # Generate log
-        self.cursor.execute("""
-            SELECT title, reminder_date, reminder_time, status, created_at 
-            FROM reminders WHERE user_id=? 
-            ORDER BY created_at DESC LIMIT 50
-        """, (self.current_user['id'],))
-        
-        reminders = self.cursor.fetchall()
-        
-        log_text.insert(tk.END, "=" * 80 + "\n")
-        log_text.insert(tk.END, f"TASK LOG - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        log_text.insert(tk.END, "=" * 80 + "\n\n")
-        
-        for reminder in reminders:
-            log_text.insert(tk.END, f"[{reminder[4]}]\n")
-            log_text.insert(tk.END, f"Title: {reminder[0]}\n")
-            log_text.insert(tk.END, f"Scheduled: {reminder[1]} at {reminder[2]}\n")
-            log_text.insert(tk.END, f"Status: {reminder[3].upper()}\n")
-            log_text.insert(tk.END, "-" * 80 + "\n\n")
+        def refresh():
+            # Generate log
+            reminders = self.db.query("""
+                SELECT title, reminder_date, reminder_time, status, created_at 
+                FROM reminders WHERE user_id=? 
+                ORDER BY created_at DESC LIMIT 50
+            """, (self.current_user['id'],))
+            
+            log_text.config(state=tk.NORMAL)
+            log_text.delete("1.0", tk.END)
+            log_text.insert(tk.END, "=" * 80 + "\n")
+            log_text.insert(tk.END, f"TASK LOG - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            log_text.insert(tk.END, "=" * 80 + "\n\n")
+            
+            for reminder in reminders:
+                log_text.insert(tk.END, f"[{reminder[4]}]\n")
+                log_text.insert(tk.END, f"Title: {reminder[0]}\n")
+                log_text.insert(tk.END, f"Scheduled: {reminder[1]} at {reminder[2]}\n")
+                log_text.insert(tk.END, f"Status: {reminder[3].upper()}\n")
+                log_text.insert(tk.END, "-" * 80 + "\n\n")
+            
+            log_text.config(state=tk.DISABLED)
         
-        log_text.config(state=tk.DISABLED)
+        return refresh
     
     def show_settings(self):
         """Display settings"""
-        self.clear_content()
-        
-        tk.Label(self.content_frame, text="Settings", 
+        self.views.show("settings")
+    
+    def build_settings(self, frame):
+        """Build the settings screen and return its refresh function"""
+        tk.Label(frame, text="Settings", 
                 font=("Arial", 24, "bold"), bg="#ecf0f1").pack(pady=20)
         
-        settings_frame = tk.Frame(self.content_frame, bg="white", relief=tk.RAISED, bd=2)
+        settings_frame = tk.Frame(frame, bg="white", relief=tk.RAISED, bd=2)
         settings_frame.pack(pady=20, padx=100)
         
-        # Get current settings
-        self.cursor.execute("SELECT * FROM settings WHERE user_id=?", (self.current_user['id'],))
-        settings = self.cursor.fetchone()
-        
-        if not settings:
-            self.cursor.execute("INSERT INTO settings (user_id) VALUES (?)", (self.current_user['id'],))
-            self.conn.commit()
-            settings = (self.current_user['id'], 'light', 1, 0)
-        
         # Theme
         tk.Label(settings_frame, text="Theme:", font=("Arial", 12), bg="white").grid(row=0, column=0, sticky="w", padx=20, pady=10)
-        theme_var = tk.StringVar(value=settings[1])
+        theme_var = tk.StringVar(value="light")
         theme_menu = ttk.Combobox(settings_frame, textvariable=theme_var, 
                                  values=["light", "dark"], font=("Arial", 12), 
                                  width=30, state="readonly")
@@ -570,113 +708,96 @@ class TeacherReminderSystem:
         
         # Notification sound
         tk.Label(settings_frame, text="Notification Sound:", font=("Arial", 12), bg="white").grid(row=1, column=0, sticky="w", padx=20, pady=10)
-        sound_var = tk.IntVar(value=settings[2])
+        sound_var = tk.IntVar(value=1)
         tk.Checkbutton(settings_frame, variable=sound_var, bg="white").grid(row=1, column=1, sticky="w", padx=20, pady=10)
         
         # Save button
         def save_settings():
-            self.cursor.execute("""
-                UPDATE settings 
-                SET theme=?, notification_sound=? 
-                WHERE user_id=?
-            """, (theme_var.get(), sound_var.get(), self.current_user['id']))
-            self.conn.commit()
+            self.db.execute("""
+                INSERT INTO settings (user_id, theme, notification_sound) 
+                VALUES (?, ?, ?) 
+                ON CONFLICT (user_id) DO UPDATE 
+                SET theme=excluded.theme, notification_sound=excluded.notification_sound
+            """, (self.current_user['id'], theme_var.get(), sound_var.get()))
+            self.settings.invalidate(self.current_user['id'])
             messagebox.showinfo("Success", "Settings saved!")
         
         tk.Button(settings_frame, text="Save Settings", command=save_settings,
                  bg="#3498db", fg="white", font=("Arial", 12, "bold"),
                  cursor="hand2", width=20).grid(row=2, column=0, columnspan=2, pady=20)
+        
+        def refresh():
+            # Get current settings
+            settings = self.settings.get(self.current_user['id'])
+            theme_var.set(settings[0])
+            sound_var.set(settings[1])
+        
+        return refresh
     
-    def play_notification_sound(self):
-        """Play notification sound based on platform"""
+    def play_notification_sound(self, user_id):
+        """Start the notification sound without waiting for it to finish"""
         # Check if sound is enabled in settings
-        self.cursor.execute("SELECT notification_sound FROM settings WHERE user_id=?", 
-                          (self.current_user['id'],))
-        result = self.cursor.fetchone()
-        
-        if result and result[0] == 1:
+        if self.settings.sound_enabled(user_id):
             try:
-                system = platform.system()
-                if system == "Windows":
-                    # Play Windows notification sound
-                    winsound.MessageBeep(winsound.MB_ICONASTERISK)
-                    # Alternative: Play system sound multiple times for emphasis
-                    for _ in range(2):
-                        winsound.Beep(800, 300)  # 800Hz for 300ms
-                elif system == "Darwin":  # macOS
-                    import os
-                    os.system('afplay /System/Library/Sounds/Glass.aiff')
-                elif system == "Linux":
-                    import os
-                    os.system('paplay /usr/share/sounds/freedesktop/stereo/message.oga')
+                play_alert()
             except Exception as e:
                 print(f"Sound error: {e}")
     
-    def check_reminders(self):
-        """Background thread to check and send notifications"""
-        while self.running:
-            try:
-                if self.current_user:
-                    now = datetime.now()
-                    current_time = now.strftime('%Y-%m-%d %H:%M')
-                    
-                    self.cursor.execute("""
-                        SELECT id, title, description 
-                        FROM reminders 
-                        WHERE user_id=? AND status='pending' 
-                        AND datetime(reminder_date || ' ' || reminder_time) <= datetime(?)
-                        AND notified=0
-                    """, (self.current_user['id'], current_time))
-                    
-                    reminders = self.cursor.fetchall()
-                    
-                    for reminder in reminders:
-                        try:
-                            # Play sound first
-                            self.play_notification_sound()
-                            
-                            # Then show notification
-                            notification.notify(
-                                title=f"⏰ Reminder: {reminder[1]}",
-                                message=reminder[2] if reminder[2] else "You have a pending task!",
-                                app_name="Teacher Reminder System",
-                                timeout=10
-                            )
-                            
-                            # Mark as notified
-                            self.cursor.execute("UPDATE reminders SET notified=1 WHERE id=?", (reminder[0],))
-                            self.conn.commit()
-                        except Exception as e:
-                            print(f"Notification error: {e}")
-                
-                time.sleep(60)  # Check every minute
-            except Exception as e:
-                print(f"Reminder check error: {e}")
-                time.sleep(60)
+    def deliver_reminders(self, user, reminders, is_advance_warning):
+        """Hand one user's due reminders to the digest stage"""
+        if not self.digests.add(user, reminders, is_advance_warning):
+            # Refused while the delivery queue is full; the notifier retries them
+            return []
+        return [reminder[0] for reminder in reminders]
+    
+    def notify_reminders(self, user, reminders, is_advance_warning):
+        """Queue one sound and one desktop notification for a digest of reminders"""
+        # One sound per digest, played alongside the notification
+        self.dispatcher.submit(self.play_notification_sound, user['id'])
+        
+        if len(reminders) == 1:
+            _, title, description, _ = reminders[0]
+            title = f"⏰ Reminder: {title}"
+            message = description if description else "You have a pending task!"
+        else:
+            title = f"⏰ {len(reminders)} reminders due"
+            message = format_digest(reminders)
+        
+        return self.dispatcher.submit_within(DIGEST_QUEUE_WAIT_SECONDS, show_notification, title=title,
+                                             message=message, app_name="Teacher Reminder System", timeout=10)
     
     def clear_window(self):
         """Clear all widgets from root window"""
         for widget in self.root.winfo_children():
             widget.destroy()
     
-    def clear_content(self):
-        """Clear content frame"""
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-    
     def logout(self):
         """Logout current user"""
         self.current_user = None
         self.show_login_screen()
     
-    def __del__(self):
-        """Cleanup on exit"""
-        self.running = False
-        if hasattr(self, 'conn'):
-            self.conn.close()
+    def close(self):
+        """Deliver held digests, stop the background threads and close the database"""
+        if hasattr(self, 'notifier'):
+            self.notifier.stop()
+        if hasattr(self, 'digests'):
+            self.digests.stop()
+        if hasattr(self, 'dispatcher'):
+            self.dispatcher.stop()
+        if hasattr(self, 'db'):
+            self.db.close()
 
 
 if __name__ == "__main__":
+    # --profile times every query and screen and logs slow ones to a file
+    metrics = Instrumentation() if "--profile" in sys.argv else None
     root = tk.Tk()
-    app = TeacherReminderSystem(root)
-    root.mainloop()
\ No newline at end of file
+    app = TeacherReminderSystem(root, metrics)
+    if "--startup-timing" in sys.argv:
+        report_startup_time(root, STARTED_AT)
+    root.mainloop()
+    # __del__ is not reliably run at exit, so shut down explicitly
+    app.close()
+    if metrics is not None:
+        print(metrics.report())
+        metrics.close()
\ No newline at end of file
@@ -0,0 +1,473 @@
+"""Reproducible performance benchmark on a synthetic reminders database
+
+Builds a database with the app's schema from a seeded generator, so the
+same options always produce the same data, then times the operations the
+app repeats most: reminder checker ticks, dashboard statistics, list
+paging, search, calendar ranges, inserts and status changes, plus
+reminder_app's data access against its old connection-per-call pattern.
+Results are written as JSON so runs before and after a change can be
+compared.
+
+    python -m benchmark [--users N] [--reminders N] [--recurrence MIX] [--output FILE]
+
+The database is built in a temporary directory and removed afterwards
+unless --db names a new file to keep.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from reminder_db import (ConnectionManager, get_dashboard_counts, get_occurrences, get_reminders_page,
+                         migrate_counters, migrate_occurrences, migrate_reminders, migrate_search,
+                         refresh_occurrences, search_reminders)
+from reminder_io import import_reminders, validate_reminder
+from reminder_recurrence import REPEAT_TYPES, SERIES_FORMAT, is_recurring, next_occurrence
+from reminder_scheduler import ReminderNotifier
+
+RESULTS_PATH = 'benchmark_results.json'
+DEFAULT_RECURRENCE = 'once=0.85,daily=0.03,weekly=0.1,monthly=0.02'
+BUILD_CHUNK_SIZE = 5000
+CATEGORIES = ('Class', 'Meeting', 'Deadline', 'Event', 'Personal', 'Other')
+# Lesson and meeting start times on school days
+SCHOOL_TIMES = ('07:30', '08:00', '08:45', '09:30', '10:15', '11:00', '11:45',
+                '12:30', '13:15', '14:00', '14:45', '15:30', '16:00')
+WORDS = ('parent', 'meeting', 'grade', 'report', 'cards', 'staff', 'field', 'trip', 'exam',
+         'lunch', 'duty', 'budget', 'review', 'science', 'fair', 'club', 'homework', 'essay',
+         'quiz', 'rubric', 'assembly', 'permission', 'slips', 'lab', 'safety', 'reading',
+         'group', 'math', 'history', 'project', 'deadline', 'conference', 'training')
+NAMES = ('Jenkins', 'Garcia', 'Patel', 'Nguyen', 'Okafor', 'Kowalski', 'Smith', 'Haddad',
+         'Lindqvist', 'Moreau', 'Tanaka', 'Silva')
+
+# Same tables as TeacherReminderAppV3.init_database; the migrations add the rest
+SCHEMA = (
+    '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        full_name TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE reminders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT,
+        reminder_date DATE NOT NULL,
+        reminder_time TIME NOT NULL,
+        category TEXT,
+        status TEXT DEFAULT 'pending',
+        repeat_type TEXT DEFAULT 'once',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        notified INTEGER DEFAULT 0,
+        advance_notified INTEGER DEFAULT 0,
+        due_at INTEGER,
+        series_start TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    ''',
+    '''
+    CREATE TABLE settings (
+        user_id INTEGER PRIMARY KEY,
+        theme TEXT DEFAULT 'light',
+        notification_sound INTEGER DEFAULT 1,
+        email_notifications INTEGER DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    ''',
+)
+
+
+def parse_mix(text):
+    """Parse 'once=0.8,weekly=0.2' into normalised {repeat_type: weight}"""
+    mix = {}
+    for part in text.split(','):
+        repeat_type, _, weight = part.partition('=')
+        repeat_type = repeat_type.strip()
+        if repeat_type not in REPEAT_TYPES:
+            raise ValueError(f"Unknown repeat type: {repeat_type}")
+        mix[repeat_type] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Recurrence weights must add up to more than 0")
+    return {repeat_type: weight / total for repeat_type, weight in mix.items()}
+
+
+def random_due(rng, now, days_back, days_ahead, distribution):
+    """Pick a due datetime between days_back ago and days_ahead from now"""
+    if distribution == 'uniform':
+        offset = rng.uniform(-days_back * 86400, days_ahead * 86400)
+        return (now + timedelta(seconds=offset)).replace(second=0, microsecond=0)
+
+    # School days at lesson times, so many reminders share a minute
+    while True:
+        day = now.date() + timedelta(days=rng.randint(-days_back, days_ahead))
+        if day.weekday() < 5:
+            break
+    return datetime.strptime(f"{day} {rng.choice(SCHOOL_TIMES)}", SERIES_FORMAT)
+
+
+def generate_reminders(rng, options, now):
+    """Yield rows for the reminders table, owned by randomly chosen users"""
+    repeat_types = list(options.mix)
+    weights = [options.mix[repeat_type] for repeat_type in repeat_types]
+    for _ in range(options.reminders):
+        start = random_due(rng, now, options.days_back, options.days_ahead, options.distribution)
+        repeat_type = rng.choices(repeat_types, weights)[0]
+        due = start
+        status = 'pending'
+        notified = 0
+        if is_recurring(repeat_type):
+            # A series that started in the past waits on its next occurrence
+            if start <= now:
+                due = next_occurrence(start, repeat_type, now)
+        elif start <= now:
+            notified = 1
+            if rng.random() < options.completed:
+                status = 'completed'
+        title = " ".join(rng.sample(WORDS, 3) + [rng.choice(NAMES)]).capitalize()
+        description = " ".join(rng.sample(WORDS, 8)) if rng.random() < 0.7 else ""
+        yield (rng.randint(1, options.users), title, description, due.strftime('%Y-%m-%d'),
+               due.strftime('%H:%M'), rng.choice(CATEGORIES), status, repeat_type, notified,
+               int(due.timestamp()), start.strftime(SERIES_FORMAT))
+
+
+def build_database(path, options, now):
+    """Create a synthetic database at path and return (rows, seconds)"""
+    rng = random.Random(options.seed)
+    started = time.perf_counter()
+    db = ConnectionManager(path, cache_size_kb=64 * 1024)
+    try:
+        with db.transaction() as cursor:
+            for sql in SCHEMA:
+                cursor.execute(sql)
+            migrate_reminders(cursor)
+            migrate_counters(cursor)
+            migrate_occurrences(cursor)
+            migrate_search(cursor)
+            cursor.executemany("INSERT INTO users (username, password, full_name) VALUES (?, ?, ?)",
+                               [(f"teacher{n:04d}", "password", f"Teacher {n}")
+                                for n in range(1, options.users + 1)])
+
+        rows = generate_reminders(rng, options, now)
+        while True:
+            chunk = list(islice(rows, BUILD_CHUNK_SIZE))
+            if not chunk:
+                break
+            with db.transaction() as cursor:
+                cursor.executemany("""
+                    INSERT INTO reminders (user_id, title, description, reminder_date, reminder_time,
+                                           category, status, repeat_type, notified, due_at, series_start)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, chunk)
+        refresh_occurrences(db)
+        with db.transaction() as cursor:
+            cursor.execute("ANALYZE")
+    finally:
+        db.close()
+    return options.reminders, time.perf_counter() - started
+
+
+def summarize(samples):
+    """Latency statistics in milliseconds for a list of durations in seconds"""
+    samples = sorted(sample * 1000 for sample in samples)
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+def measure(func, repeat, setup=None):
+    """Run setup() untimed and func() timed, repeat times"""
+    samples = []
+    for index in range(repeat):
+        if setup is not None:
+            setup(index)
+        started = time.perf_counter()
+        func(index)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+class Benchmarks:
+    """The timed operations, run against one synthetic database"""
+
+    def __init__(self, db, options):
+        self.db = db
+        self.options = options
+        self.rng = random.Random(options.seed + 1)
+        self.user_ids = [self.rng.randint(1, options.users) for _ in range(options.repeat)]
+        self.notifier = ReminderNotifier(db, self.deliver)
+
+    def deliver(self, user, reminders, is_advance_warning):
+        return [reminder[0] for reminder in reminders]
+
+    def pick_ids(self, count, status):
+        rows = self.db.query("SELECT id FROM reminders WHERE status=? AND repeat_type='once'", (status,))
+        return [row[0] for row in self.rng.sample(rows, min(count, len(rows)))]
+
+    def run(self):
+        options = self.options
+        repeat = options.repeat
+        results = {}
+
+        # Checker: the startup load, a tick with nothing due, and a tick
+        # delivering a burst of reminders that all came due together
+        results["checker_load"] = measure(lambda i: self.notifier.load(), repeat)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["checker_tick_idle"] = measure(lambda i: self.notifier.check(), repeat)
+            cohort = self.pick_ids(options.due_per_tick, 'pending')
+
+            def make_due(index):
+                with self.db.transaction() as cursor:
+                    cursor.executemany("UPDATE reminders SET notified=0, due_at=? WHERE id=?",
+                                       [(int(time.time()) - 1, reminder_id) for reminder_id in cohort])
+            results["checker_tick_due"] = measure(lambda i: self.notifier.check(), repeat, make_due)
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        results["dashboard"] = measure(lambda i: self.dashboard(self.user_ids[i], today), repeat)
+
+        # Reminders list: the first page, scrolling ten pages, and a search
+        results["list_first_page"] = measure(
+            lambda i: get_reminders_page(self.db, self.user_ids[i]), repeat)
+        results["list_pending_first_page"] = measure(
+            lambda i: get_reminders_page(self.db, self.user_ids[i], 'pending'), repeat)
+        results["list_scroll_10_pages"] = measure(lambda i: self.scroll(self.user_ids[i], 10), repeat)
+        results["search"] = measure(
+            lambda i: search_reminders(self.db, self.user_ids[i], f"{WORDS[i % len(WORDS)]} "
+                                       f"{NAMES[i % len(NAMES)]}"), repeat)
+
+        month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+        results["calendar_month"] = measure(
+            lambda i: get_occurrences(self.db, self.user_ids[i], int(month_start.timestamp()),
+                                      int(month_end.timestamp())), repeat)
+
+        # Writes: the add form's single insert and a bulk import batch
+        due = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        results["insert_single"] = measure(lambda i: self.insert(self.user_ids[i], due), repeat)
+        records = [(n, (f"Imported reminder {n}", "", due, "09:00", "Class", "once"))
+                   for n in range(options.bulk_size)]
+        results[f"insert_bulk_{options.bulk_size}"] = measure(
+            lambda i: import_reminders(self.db, self.user_ids[i], records), max(repeat // 4, 1))
+
+        # Status changes: one Mark Complete, then a whole batch in one transaction
+        single = self.pick_ids(repeat, 'pending')
+        results["status_single"] = measure(
+            lambda i: self.db.execute("UPDATE reminders SET status='completed' WHERE id=?",
+                                      (single[i % len(single)],)), repeat)
+        batch = self.pick_ids(options.bulk_size, 'pending')
+        results[f"status_bulk_{options.bulk_size}"] = measure(
+            lambda i: self.set_status(batch, 'completed'), max(repeat // 4, 1),
+            lambda i: self.set_status(batch, 'pending'))
+        return results
+
+    def dashboard(self, user_id, today):
+        # The dashboard's two reads: the counters and the next five reminders
+        get_dashboard_counts(self.db, user_id, today)
+        self.db.query("""
+            SELECT title, reminder_date, reminder_time, category
+            FROM reminders
+            WHERE user_id=? AND status='pending' AND notified=0 AND due_at >= ?
+            ORDER BY due_at
+            LIMIT 5
+        """, (user_id, int(time.time())))
+
+    def scroll(self, user_id, pages):
+        key = None
+        for _ in range(pages):
+            rows = get_reminders_page(self.db, user_id, after=key)
+            if not rows:
+                break
+            key = (rows[-1][2], rows[-1][3], rows[-1][0])
+
+    def insert(self, user_id, due):
+        row = validate_reminder("Benchmark reminder", "", due, "09:00", "Class", "once")
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO reminders (user_id, title, description, reminder_date,
+                                     reminder_time, category, repeat_type, due_at, series_start)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (user_id,) + row)
+
+    def set_status(self, ids, status):
+        with self.db.transaction() as cursor:
+            cursor.executemany("UPDATE reminders SET status=? WHERE id=?",
+                               [(status, reminder_id) for reminder_id in ids])
+
+
+def per_call(path, sql, params=(), many=False):
+    # reminder_app's old data access: a fresh connection for every statement
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.executemany(sql, params) if many else conn.execute(sql, params)
+        rows = cursor.fetchall()
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+
+def benchmark_reminder_store(options):
+    """Time reminder_app's ReminderStore against a connection per call
+
+    Both sides get an identical reminders table of options.app_reminders
+    rows; the per-call side keeps the rollback journal the app used before.
+    """
+    from reminder_app import DATE_FORMAT, ReminderStore
+
+    rng = random.Random(options.seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    rows = [(" ".join(rng.sample(WORDS, 3)),
+             (now + timedelta(minutes=rng.randint(-60 * 24 * options.days_back,
+                                                  60 * 24 * options.days_ahead))).strftime(DATE_FORMAT), "")
+            for _ in range(options.app_reminders)]
+    batch = [("Batch reminder", (now + timedelta(days=1)).strftime(DATE_FORMAT), "")] * options.bulk_size
+    insert = "INSERT INTO reminders (title, remind_at, recurring, series_start) VALUES (?, ?, ?, ?)"
+    start_str = now.strftime(DATE_FORMAT)
+    end_str = (now + timedelta(days=1)).strftime(DATE_FORMAT)
+    repeat = options.repeat
+    bulk_repeat = max(repeat // 10, 1)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, 'per_call.db')
+        store = ReminderStore(legacy_path)
+        store.add_many(rows)
+        store.conn.execute("PRAGMA journal_mode=DELETE")
+        store.close()
+        store = ReminderStore(os.path.join(directory, 'store.db'))
+        store.add_many(rows)
+
+        try:
+            results["app_add_per_call"] = measure(
+                lambda i: per_call(legacy_path, insert, batch[0] + batch[0][1:2]), repeat)
+            results["app_add_store"] = measure(lambda i: store.add(*batch[0]), repeat)
+            results[f"app_add_{options.bulk_size}_per_call"] = measure(
+                lambda i: [per_call(legacy_path, insert, row + row[1:2]) for row in batch], bulk_repeat)
+            results[f"app_add_many_{options.bulk_size}_store"] = measure(
+                lambda i: store.add_many(batch), bulk_repeat)
+
+            legacy_ids = [row[0] for row in per_call(legacy_path, "SELECT id FROM reminders ORDER BY id DESC")]
+            store_ids = [row[0] for row in store.conn.execute("SELECT id FROM reminders ORDER BY id DESC")]
+            results["app_delete_per_call"] = measure(
+                lambda i: per_call(legacy_path, "DELETE FROM reminders WHERE id = ?", (legacy_ids[i],)), repeat)
+            results["app_delete_store"] = measure(lambda i: store.delete(store_ids[i]), repeat)
+            legacy_ids = legacy_ids[repeat:]
+            store_ids = store_ids[repeat:]
+            size = options.bulk_size
+            results[f"app_delete_{size}_per_call"] = measure(
+                lambda i: [per_call(legacy_path, "DELETE FROM reminders WHERE id = ?", (rem_id,))
+                           for rem_id in legacy_ids[i * size:(i + 1) * size]], bulk_repeat)
+            results[f"app_delete_many_{size}_store"] = measure(
+                lambda i: store.delete_many(store_ids[i * size:(i + 1) * size]), bulk_repeat)
+
+            results["app_get_all_per_call"] = measure(
+                lambda i: per_call(legacy_path, "SELECT id, title, remind_at, recurring, done FROM reminders "
+                                                "ORDER BY remind_at"), repeat)
+            results["app_get_all_store"] = measure(lambda i: store.get_all(), repeat)
+            results["app_fetch_range_per_call"] = measure(
+                lambda i: per_call(legacy_path, "SELECT id, title, remind_at FROM reminders "
+                                                "WHERE done = 0 AND remind_at > ? AND remind_at <= ? "
+                                                "ORDER BY remind_at", (start_str, end_str)), repeat)
+            results["app_fetch_range_store"] = measure(lambda i: store.fetch_range(start_str, end_str), repeat)
+        finally:
+            store.close()
+    return results
+
+
+def run_benchmark(path, options):
+    """Build the database at path, run every benchmark and return the report"""
+    now = datetime.now().replace(second=0, microsecond=0)
+    rows, build_seconds = build_database(path, options, now)
+    db = ConnectionManager(path)
+    try:
+        results = Benchmarks(db, options).run()
+    finally:
+        db.close()
+    results.update(benchmark_reminder_store(options))
+
+    config = {name: value for name, value in vars(options).items() if name not in ('db', 'output')}
+    return {
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "database": {
+            "reminders": rows,
+            "build_seconds": round(build_seconds, 3),
+            "size_bytes": os.path.getsize(path),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the reminder system on synthetic data")
+    parser.add_argument("--users", type=int, default=50, help="number of teachers")
+    parser.add_argument("--reminders", type=int, default=100000, help="total number of reminders")
+    parser.add_argument("--days-back", type=int, default=180, help="oldest reminder, in days ago")
+    parser.add_argument("--days-ahead", type=int, default=90, help="latest reminder, in days from now")
+    parser.add_argument("--distribution", choices=("school", "uniform"), default="school",
+                        help="school: weekdays at lesson times; uniform: any minute")
+    parser.add_argument("--recurrence", type=parse_mix, default=DEFAULT_RECURRENCE, dest="mix",
+                        help=f"repeat type weights (default {DEFAULT_RECURRENCE})")
+    parser.add_argument("--completed", type=float, default=0.8,
+                        help="fraction of past one-off reminders marked completed")
+    parser.add_argument("--due-per-tick", type=int, default=50,
+                        help="reminders coming due together in a checker tick")
+    parser.add_argument("--app-reminders", type=int, default=20000,
+                        help="rows in the reminder_app database for the data access comparison")
+    parser.add_argument("--bulk-size", type=int, default=1000, help="rows per bulk insert or status change")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per operation")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the generated data")
+    parser.add_argument("--db", help="keep the generated database at this new path")
+    parser.add_argument("--output", default=RESULTS_PATH, help="JSON results file ('-' for stdout)")
+    options = parser.parse_args(argv)
+
+    if options.db and os.path.exists(options.db):
+        print(f"Refusing to overwrite {options.db}")
+        return 1
+
+    # Keep migration messages out of JSON written to stdout
+    log = sys.stderr if options.output == '-' else sys.stdout
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(log):
+        path = options.db or os.path.join(directory, 'benchmark.db')
+        report = run_benchmark(path, options)
+
+    if options.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Built {report['database']['reminders']} reminders in "
+              f"{report['database']['build_seconds']:.2f} s")
+        for name, stats in report["results"].items():
+            print(f"  {name:<26} median {stats['median_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms")
+        print(f"Results written to {options.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
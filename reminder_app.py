@@ -1,78 +1,339 @@
+import time
+STARTED_AT = time.perf_counter()
 import sqlite3
 import os
+import sys
 import threading
-from datetime import datetime
+from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import ttk, messagebox
-from apscheduler.schedulers.background import BackgroundScheduler
-from plyer import notification
+from reminder_delivery import DigestCoalescer, format_digest, show_notification as notify
+from reminder_scheduler import TimerScheduler
+from reminder_widgets import PagedTreeview, report_startup_time
+from reminder_recurrence import (RECURRING_TYPES, is_recurring, next_occurrence, occurrences,
+                                 parse_series_start)
 
 # ---------- Config ----------
 DB_PATH = os.path.join(os.path.expanduser("~"), ".teacher_reminder.db")
 DATE_FORMAT = "%Y-%m-%d %H:%M"
+# Only reminders due this far ahead get scheduler jobs; a periodic sync
+# brings later ones in as the window moves on
+JOB_HORIZON = timedelta(hours=24)
+JOB_SYNC_INTERVAL_MS = 10 * 60 * 1000
+# Reminders that come due while the app is closed or asleep are still
+# shown if they are at most this late; runs missed together fire once
+MISFIRE_GRACE = timedelta(hours=1)
+COALESCE_MISSED = True
+# Room for every statement this module prepares
+STATEMENT_CACHE_SIZE = 32
 # ----------------------------
 
 # ---------- Database ----------
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS reminders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        remind_at TEXT NOT NULL,
-        recurring TEXT DEFAULT '',
-        done INTEGER DEFAULT 0
-    )
-    """)
-    conn.commit()
-    conn.close()
-
-def add_reminder_db(title, remind_at_str, recurring=""):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO reminders (title, remind_at, recurring) VALUES (?, ?, ?)",
-              (title, remind_at_str, recurring))
-    conn.commit()
-    conn.close()
-
-def delete_reminder_db(rem_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM reminders WHERE id = ?", (rem_id,))
-    conn.commit()
-    conn.close()
-
-def get_all_reminders():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, title, remind_at, recurring, done FROM reminders ORDER BY remind_at")
-    rows = c.fetchall()
-    conn.close()
-    return rows
+def normalize_remind_at(value):
+    # remind_at is compared as text, so "2026-10-18 3:58" must be stored as "2026-10-18 03:58"
+    return datetime.strptime(value.strip(), DATE_FORMAT).strftime(DATE_FORMAT)
+
+class ReminderStore:
+    """Data access for the reminders table over one long-lived connection
+
+    Every click and scheduler job used to open and close its own
+    connection, paying for the schema load and a cold page cache each
+    time. The connection is shared by the Tk thread and the scheduler
+    thread under a lock, and keeps every statement of this module in its
+    statement cache. The *_many methods write a whole batch in one
+    transaction.
+    """
+
+    def __init__(self, path, cached_statements=STATEMENT_CACHE_SIZE):
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=cached_statements)
+        self.lock = threading.RLock()
+        # WAL lets the job store's connection read while this one writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.init_schema()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def init_schema(self):
+        with self.lock, self.conn:
+            c = self.conn.cursor()
+            c.execute("""
+            CREATE TABLE IF NOT EXISTS reminders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                remind_at TEXT NOT NULL,
+                recurring TEXT DEFAULT '',
+                done INTEGER DEFAULT 0,
+                series_start TEXT
+            )
+            """)
+            # Older databases: remember where each series started so monthly
+            # occurrences keep their day of month
+            c.execute("PRAGMA table_info(reminders)")
+            if "series_start" not in [col[1] for col in c.fetchall()]:
+                c.execute("ALTER TABLE reminders ADD COLUMN series_start TEXT")
+                c.execute("UPDATE reminders SET series_start = remind_at WHERE series_start IS NULL")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_reminders_remind_at ON reminders (remind_at)")
+            # Reminders used to stay done = 0 after firing. On first upgrade treat
+            # past one-off reminders as delivered, so the catch-up pass only sees
+            # ones missed from now on
+            c.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_reminders_pending'")
+            if c.fetchone() is None:
+                c.execute("UPDATE reminders SET done = 1 WHERE done = 0 AND recurring = '' AND remind_at <= ?",
+                          (datetime.now().strftime(DATE_FORMAT),))
+                c.execute("CREATE INDEX idx_reminders_pending ON reminders (remind_at) WHERE done = 0")
+
+    def add(self, title, remind_at_str, recurring=""):
+        remind_at_str = normalize_remind_at(remind_at_str)
+        with self.lock, self.conn:
+            c = self.conn.execute("INSERT INTO reminders (title, remind_at, recurring, series_start) VALUES (?, ?, ?, ?)",
+                                  (title, remind_at_str, recurring, remind_at_str))
+            return c.lastrowid
+
+    def add_many(self, reminders):
+        # reminders: (title, remind_at_str, recurring) tuples, written in one transaction
+        rows = []
+        for title, remind_at, recurring in reminders:
+            remind_at = normalize_remind_at(remind_at)
+            rows.append((title, remind_at, recurring, remind_at))
+        with self.lock, self.conn:
+            c = self.conn.executemany(
+                "INSERT INTO reminders (title, remind_at, recurring, series_start) VALUES (?, ?, ?, ?)", rows)
+            return c.rowcount
+
+    def delete(self, rem_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM reminders WHERE id = ?", (rem_id,))
+
+    def delete_many(self, rem_ids):
+        with self.lock, self.conn:
+            c = self.conn.executemany("DELETE FROM reminders WHERE id = ?", ((rem_id,) for rem_id in rem_ids))
+            return c.rowcount
+
+    def get_all(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, title, remind_at, recurring, done FROM reminders ORDER BY remind_at").fetchall()
+
+    def get_page(self, after=None, limit=100, forward=True):
+        # Keyset pagination on (remind_at, id); after is the key to continue from
+        with self.lock:
+            if after is None:
+                c = self.conn.execute("SELECT id, title, remind_at FROM reminders ORDER BY remind_at, id LIMIT ?",
+                                      (limit,))
+            elif forward:
+                c = self.conn.execute("""SELECT id, title, remind_at FROM reminders WHERE (remind_at, id) > (?, ?)
+                                         ORDER BY remind_at, id LIMIT ?""", (*after, limit))
+            else:
+                c = self.conn.execute("""SELECT id, title, remind_at FROM reminders WHERE (remind_at, id) < (?, ?)
+                                         ORDER BY remind_at DESC, id DESC LIMIT ?""", (*after, limit))
+            return c.fetchall()
+
+    def fetch_range(self, start_str, end_str):
+        # Undelivered reminders due after start (or ever, if start is None)
+        # and no later than end, from the pending index
+        with self.lock:
+            if start_str is None:
+                c = self.conn.execute("""SELECT id, title, remind_at FROM reminders
+                                         WHERE done = 0 AND remind_at <= ? ORDER BY remind_at""", (end_str,))
+            else:
+                c = self.conn.execute("""SELECT id, title, remind_at FROM reminders
+                                         WHERE done = 0 AND remind_at > ? AND remind_at <= ? ORDER BY remind_at""",
+                                      (start_str, end_str))
+            return c.fetchall()
+
+    def get_series(self, rem_id):
+        with self.lock:
+            return self.conn.execute("SELECT recurring, COALESCE(series_start, remind_at) FROM reminders WHERE id = ?",
+                                     (rem_id,)).fetchone()
+
+    def claim(self, rem_id, remind_at_str=None, next_remind_at_str=None):
+        # Record one occurrence as delivered: one-off reminders are marked done,
+        # recurring ones move on to next_remind_at_str. Returns False if the
+        # occurrence was already handled, so it is never delivered twice
+        if next_remind_at_str is None:
+            sql = "UPDATE reminders SET done = 1 WHERE id = ? AND done = 0"
+            params = [rem_id]
+        else:
+            sql = "UPDATE reminders SET remind_at = ? WHERE id = ? AND done = 0"
+            params = [next_remind_at_str, rem_id]
+        if remind_at_str is not None:
+            sql += " AND remind_at = ?"
+            params.append(remind_at_str)
+        with self.lock, self.conn:
+            return self.conn.execute(sql, params).rowcount == 1
+
+    def get_occurrences_between(self, start, end):
+        # One-off reminders come from the remind_at index; each recurring series
+        # is expanded lazily and stops at the end of the range
+        with self.lock:
+            c = self.conn.execute("""SELECT id, title, remind_at FROM reminders
+                                     WHERE recurring = '' AND remind_at >= ? AND remind_at < ?""",
+                                  (start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)))
+            rows = [(datetime.strptime(remind_at, DATE_FORMAT), rid, title) for rid, title, remind_at in c.fetchall()]
+            series = self.conn.execute("""SELECT id, title, recurring, COALESCE(series_start, remind_at)
+                                          FROM reminders WHERE recurring != ''""").fetchall()
+        for rid, title, recurring, series_start in series:
+            first = parse_series_start(series_start)
+            if first is None:
+                continue
+            for occurrence in occurrences(first, recurring, after=start - timedelta(minutes=1), until=end):
+                if occurrence < end:
+                    rows.append((occurrence, rid, title))
+        return sorted(rows)
+
+store = None
+
+def get_store():
+    # The connection is opened on first use and kept until the app exits
+    global store
+    if store is None:
+        store = ReminderStore(DB_PATH)
+    return store
 # ----------------------------
 
 # ---------- Notification / Scheduler ----------
-scheduler = BackgroundScheduler()
+scheduler = None
+
+def get_scheduler():
+    # APScheduler is imported on first use, after the window is up, and
+    # keeps its jobs in DB_PATH; without it a minimal in-process scheduler
+    # runs the same one-shot jobs and the catch-up pass covers restarts
+    global scheduler
+    if scheduler is None:
+        try:
+            from apscheduler.schedulers.background import BackgroundScheduler
+            from reminder_jobstore import SQLiteJobStore
+            scheduler = BackgroundScheduler(
+                jobstores={"default": SQLiteJobStore(DB_PATH)},
+                job_defaults={"misfire_grace_time": int(MISFIRE_GRACE.total_seconds()),
+                              "coalesce": COALESCE_MISSED})
+        except ImportError:
+            scheduler = TimerScheduler()
+    return scheduler
 
 def show_notification(title, message):
     # plyer handles cross-platform notifications reasonably; OS behavior may vary.
-    notification.notify(title=title, message=message, app_name="Teacher Reminder", timeout=10)
+    notify(title=title, message=message, app_name="Teacher Reminder", timeout=10)
+
+def show_digest(user, reminders, is_advance_warning):
+    if len(reminders) == 1:
+        show_notification("Reminder", reminders[0][1])
+    else:
+        show_notification(f"{len(reminders)} reminders", format_digest(reminders))
+
+# Jobs firing together are merged into one notification, at most one a minute
+digests = DigestCoalescer(show_digest, window_seconds=60)
+
+class JobSync:
+    """Keeps scheduler jobs in step with the reminders due within a horizon
+
+    Each scheduled reminder is remembered by its (remind_at, title)
+    fingerprint. sync() reads the reminders due before now + horizon and
+    only adds, replaces or removes jobs whose fingerprint changed, so a
+    refresh with nothing new does not touch the scheduler at all. Overdue
+    reminders are caught up first, so dropping their jobs loses nothing.
+    """
+
+    def __init__(self, horizon=JOB_HORIZON):
+        self.horizon = horizon
+        self.scheduled = {}
+        self.lock = threading.Lock()
+
+    def sync(self):
+        # A job can miss its reminder (the machine slept, or this sync raced
+        # the fire time); claim() stops a job that still fires from
+        # delivering it twice
+        catch_up_missed()
+        now = datetime.now()
+        rows = get_store().fetch_range(now.strftime(DATE_FORMAT), (now + self.horizon).strftime(DATE_FORMAT))
+        wanted = {rid: (remind_at, title) for rid, title, remind_at in rows}
+        with self.lock:
+            # Jobs that already fired, or whose reminder was deleted or moved away
+            for rid in [rid for rid in self.scheduled if rid not in wanted]:
+                self._remove(rid)
+            for rid, (remind_at, title) in wanted.items():
+                if self.scheduled.get(rid) == (remind_at, title):
+                    continue
+                try:
+                    remind_time = datetime.strptime(remind_at, DATE_FORMAT)
+                except ValueError:
+                    continue
+                schedule_job(rid, title, remind_time)
+                self.scheduled[rid] = (remind_at, title)
+
+    def update(self, rem_id, title, remind_time):
+        # A reminder moved to remind_time: reschedule it if it is due soon
+        with self.lock:
+            if remind_time <= datetime.now() + self.horizon:
+                schedule_job(rem_id, title, remind_time)
+                self.scheduled[rem_id] = (remind_time.strftime(DATE_FORMAT), title)
+            elif rem_id in self.scheduled:
+                self._remove(rem_id)
+
+    def forget(self, rem_id):
+        with self.lock:
+            self._remove(rem_id)
+
+    def _remove(self, rem_id):
+        self.scheduled.pop(rem_id, None)
+        try:
+            get_scheduler().remove_job(f"rem_{rem_id}")
+        except Exception:
+            pass
+
+jobs = JobSync()
 
 def schedule_job(rem_id, title, remind_time):
     run_date = remind_time
     job_id = f"rem_{rem_id}"
-    # Remove existing job if any
-    try:
-        scheduler.remove_job(job_id)
-    except Exception:
-        pass
-    scheduler.add_job(func=notify_and_mark, trigger='date', run_date=run_date, args=[rem_id, title], id=job_id)
+    # An existing job for the reminder is replaced in one step
+    get_scheduler().add_job(func=notify_and_mark, trigger='date', run_date=run_date,
+                            args=[rem_id, title, remind_time.strftime(DATE_FORMAT)], id=job_id,
+                            replace_existing=True)
     
-def notify_and_mark(rem_id, title):
-    show_notification("Reminder", title)
-    # For MVP we won't mark recurring; just show notification.
-    # Could update DB (e.g., mark done) if desired.
+def notify_and_mark(rem_id, title, remind_at=None):
+    # Recurring reminders move on to their next occurrence; only that one
+    # is stored and scheduled, however long the series runs
+    row = get_store().get_series(rem_id)
+    if row is None:
+        return
+    upcoming = None
+    if is_recurring(row[0]):
+        start = parse_series_start(row[1])
+        upcoming = next_occurrence(start, row[0], datetime.now()) if start else None
+    # A job restored from the job store and the catch-up pass may both
+    # reach the same occurrence; only the first claim delivers it
+    if not get_store().claim(rem_id, remind_at, upcoming.strftime(DATE_FORMAT) if upcoming else None):
+        return
+    digests.add({"id": None}, [(rem_id, title, "", None)])
+    if upcoming:
+        jobs.update(rem_id, title, upcoming)
+
+def catch_up_missed():
+    # Reminders that came due while the app was closed: recent ones are
+    # delivered as usual (merged into one digest), older ones are recorded
+    # and listed in a single "missed" notification instead of dropped
+    now = datetime.now()
+    missed = []
+    for rid, title, remind_at in get_store().fetch_range(None, now.strftime(DATE_FORMAT)):
+        try:
+            due = datetime.strptime(remind_at, DATE_FORMAT)
+        except ValueError:
+            continue
+        if now - due <= MISFIRE_GRACE:
+            notify_and_mark(rid, title, remind_at)
+            continue
+        row = get_store().get_series(rid)
+        start = parse_series_start(row[1]) if row and is_recurring(row[0]) else None
+        upcoming = next_occurrence(start, row[0], now) if start else None
+        if get_store().claim(rid, remind_at, upcoming.strftime(DATE_FORMAT) if upcoming else None):
+            missed.append((rid, f"{title} ({remind_at})", "", None))
+    if missed:
+        show_notification(f"{len(missed)} missed reminders", format_digest(missed))
+    return len(missed)
 # ----------------------------
 
 # ---------- GUI ----------
@@ -82,9 +343,25 @@ class ReminderApp(tk.Tk):
         self.title("Automated Teacher Reminder - MVP")
         self.geometry("640x420")
         self.create_widgets()
+        # Load reminders and start the scheduler once the window is shown
+        self.after_idle(self.start_scheduler)
+
+    def start_scheduler(self):
+        try:
+            catch_up_missed()
+        except Exception as e:
+            print(f"Catch-up error: {e}")
         self.refresh_list()
-        # Start scheduler
-        scheduler.start()
+        get_scheduler().start()
+        self.after(JOB_SYNC_INTERVAL_MS, self.sync_jobs)
+
+    def sync_jobs(self):
+        # Move the job horizon on, even when the list is never refreshed
+        try:
+            jobs.sync()
+        except Exception as e:
+            print(f"Job sync error: {e}")
+        self.after(JOB_SYNC_INTERVAL_MS, self.sync_jobs)
 
     def create_widgets(self):
         frm = ttk.Frame(self, padding=12)
@@ -102,7 +379,12 @@ class ReminderApp(tk.Tk):
         self.dt_var = tk.StringVar(value=(datetime.now().strftime(DATE_FORMAT)))
         ttk.Entry(input_frame, textvariable=self.dt_var, width=25).grid(row=1, column=1, sticky=tk.W, padx=4, pady=4)
 
-        ttk.Button(input_frame, text="Add Reminder", command=self.add_reminder).grid(row=2, column=0, columnspan=2, pady=8)
+        ttk.Label(input_frame, text="Repeat:").grid(row=2, column=0, sticky=tk.W, padx=4, pady=4)
+        self.repeat_var = tk.StringVar(value="")
+        ttk.Combobox(input_frame, textvariable=self.repeat_var, values=("",) + RECURRING_TYPES,
+                     width=12, state="readonly").grid(row=2, column=1, sticky=tk.W, padx=4, pady=4)
+
+        ttk.Button(input_frame, text="Add Reminder", command=self.add_reminder).grid(row=3, column=0, columnspan=2, pady=8)
 
         # Reminders list
         list_frame = ttk.LabelFrame(frm, text="Scheduled Reminders")
@@ -118,8 +400,12 @@ class ReminderApp(tk.Tk):
         self.tree.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
 
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Only a window of rows is kept in the tree; pages load on scroll
+        self.pages = PagedTreeview(self.tree, get_store().get_page,
+                                   key_of=lambda row: (row[2], row[0]),
+                                   iid_of=lambda row: str(row[0]),
+                                   scrollbar=scrollbar)
 
         btn_frame = ttk.Frame(frm)
         btn_frame.pack(fill=tk.X, padx=6, pady=6)
@@ -137,26 +423,19 @@ class ReminderApp(tk.Tk):
         except Exception as e:
             messagebox.showerror("Format error", f"Date/time format incorrect. Use {DATE_FORMAT}")
             return
-        add_reminder_db(title, dt_str)
+        get_store().add(title, dt.strftime(DATE_FORMAT), self.repeat_var.get())
         # Get ID of last inserted row to schedule (simpler: reload all and schedule)
         self.refresh_list()
         messagebox.showinfo("Added", "Reminder added and scheduled.")
 
     def refresh_list(self):
-        # Clear tree
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        rows = get_all_reminders()
-        for r in rows:
-            rid, title, remind_at, recurring, done = r
-            self.tree.insert("", tk.END, values=(rid, title, remind_at))
-            # schedule if in future
-            try:
-                dt = datetime.strptime(remind_at, DATE_FORMAT)
-                if dt > datetime.now():
-                    schedule_job(rid, title, dt)
-            except Exception:
-                pass
+        # Only rows that changed since the last refresh are touched
+        self.pages.refresh()
+        # Only jobs for new, edited or deleted reminders are touched
+        try:
+            jobs.sync()
+        except Exception as e:
+            print(f"Job sync error: {e}")
 
     def delete_selected(self):
         sel = self.tree.selection()
@@ -166,21 +445,23 @@ class ReminderApp(tk.Tk):
         item = sel[0]
         vals = self.tree.item(item, "values")
         rem_id = vals[0]
-        delete_reminder_db(rem_id)
-        try:
-            scheduler.remove_job(f"rem_{rem_id}")
-        except Exception:
-            pass
-        self.refresh_list()
+        get_store().delete(rem_id)
+        jobs.forget(int(rem_id))
+        self.pages.remove_row(item)
         messagebox.showinfo("Deleted", "Reminder deleted.")
 
 if __name__ == "__main__":
-    init_db()
+    get_store()
     # Run GUI in main thread (APScheduler runs background threads)
     app = ReminderApp()
+    if "--startup-timing" in sys.argv:
+        report_startup_time(app, STARTED_AT)
     app.mainloop()
     # Shutdown scheduler when app closes
     try:
-        scheduler.shutdown(wait=False)
+        get_scheduler().shutdown(wait=False)
     except Exception:
         pass
+    # Show any digest still held back rather than lose it
+    digests.stop()
+    get_store().close()
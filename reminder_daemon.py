@@ -0,0 +1,141 @@
+"""Headless reminder service: delivers every user's reminders without the GUI
+
+Run with `python -m reminder_daemon` next to teacher_reminders.db. Only the
+scheduler and the delivery pipeline are started, so it works on machines
+without a display. Reminders added or changed from the GUI are picked up by
+watching PRAGMA data_version. Run it instead of, not alongside, a GUI that
+is left open, or reminders are delivered twice.
+"""
+import argparse
+import signal
+import threading
+import time
+
+from reminder_db import (ConnectionManager, SettingsCache, get_columns, migrate_counters,
+                         migrate_occurrences, migrate_reminders, migrate_search)
+from reminder_delivery import DigestCoalescer, NotificationDispatcher, notify_digest
+from reminder_metrics import Instrumentation
+from reminder_scheduler import ReminderNotifier
+
+DB_PATH = 'teacher_reminders.db'
+ADVANCE_WARNING_SECONDS = 10 * 60
+DIGEST_WINDOW_SECONDS = 60
+
+
+class ReminderDaemon:
+    """Runs the reminder notifier and delivery workers against a database file"""
+
+    def __init__(self, path=DB_PATH, advance_seconds=ADVANCE_WARNING_SECONDS, poll_seconds=2,
+                 digest_window_seconds=DIGEST_WINDOW_SECONDS, metrics=None):
+        self.path = path
+        self.advance_seconds = advance_seconds
+        self.poll_seconds = poll_seconds
+        self.digest_window_seconds = digest_window_seconds
+        self.metrics = metrics
+        self.stopped = threading.Event()
+        self.db = None
+        self.settings = None
+        self.dispatcher = None
+        self.digests = None
+        self.notifier = None
+        self.data_version = None
+
+    def start(self):
+        """Open the database and start the delivery pipeline"""
+        self.db = ConnectionManager(self.path, metrics=self.metrics)
+        with self.db.transaction() as cursor:
+            columns = get_columns(cursor, 'reminders')
+            if not columns:
+                raise RuntimeError(f"No reminders table in {self.path}; start the app once to create it")
+            migrate_reminders(cursor)
+            migrate_counters(cursor)
+            migrate_occurrences(cursor)
+            migrate_search(cursor)
+
+        # Advance warnings need the column added by the V3 schema
+        if 'advance_notified' not in columns:
+            self.advance_seconds = 0
+
+        self.settings = SettingsCache(self.db)
+        self.settings.load()
+        self.dispatcher = NotificationDispatcher()
+        self.dispatcher.start()
+        self.digests = DigestCoalescer(self.notify_reminders, window_seconds=self.digest_window_seconds)
+        self.notifier = ReminderNotifier(self.db, self.deliver_reminders,
+                                         advance_seconds=self.advance_seconds)
+        self.notifier.start()
+        self.data_version = self.read_data_version()
+
+    def stop(self):
+        """Ask run() to return"""
+        self.stopped.set()
+
+    def close(self):
+        """Stop the threads and close the database"""
+        if self.notifier is not None:
+            self.notifier.stop()
+        if self.digests is not None:
+            self.digests.stop()
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+        if self.db is not None:
+            self.db.close()
+
+    def read_data_version(self):
+        # Read on the writer so the daemon's own deliveries don't trigger a reload
+        return self.db.data_version()
+
+    def run(self):
+        """Reload the schedule whenever another connection commits, until stopped"""
+        while not self.stopped.wait(self.poll_seconds):
+            data_version = self.read_data_version()
+            if data_version != self.data_version:
+                self.data_version = data_version
+                self.settings.load()
+                self.notifier.load()
+
+    def deliver_reminders(self, user, reminders, is_advance_warning):
+        """Hand one user's due reminders to the digest stage"""
+        if not self.digests.add(user, reminders, is_advance_warning):
+            # Refused while the delivery queue is full; the notifier retries them
+            return []
+        return [reminder[0] for reminder in reminders]
+
+    def notify_reminders(self, user, reminders, is_advance_warning):
+        """Queue one sound and one desktop notification for a digest of reminders"""
+        return notify_digest(self.dispatcher, self.settings, user, reminders, is_advance_warning,
+                             self.advance_seconds // 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deliver teacher reminders without the GUI")
+    parser.add_argument("--db", default=DB_PATH, help="path to the reminders database")
+    parser.add_argument("--advance-minutes", type=int, default=ADVANCE_WARNING_SECONDS // 60,
+                        help="minutes before a reminder to send a warning (0 disables)")
+    parser.add_argument("--poll", type=float, default=2,
+                        help="seconds between checks for changes made by other processes")
+    parser.add_argument("--digest-window", type=float, default=DIGEST_WINDOW_SECONDS,
+                        help="at most one notification per user per this many seconds")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every query and log slow ones to slow_operations.log")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    metrics = Instrumentation() if args.profile else None
+    daemon = ReminderDaemon(args.db, args.advance_minutes * 60, args.poll, args.digest_window, metrics)
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.start()
+        print(f"Reminder daemon started in {(time.perf_counter() - started) * 1000:.0f} ms")
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+        if metrics is not None:
+            print(metrics.report())
+            metrics.close()
+
+
+if __name__ == "__main__":
+    main()
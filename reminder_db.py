@@ -0,0 +1,781 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from reminder_recurrence import RECURRING_TYPES, is_recurring, occurrences, parse_series_start
+
+# The occurrence index covers this many days either side of today
+OCCURRENCE_HISTORY_DAYS = 366
+OCCURRENCE_HORIZON_DAYS = 366
+# Each writer transaction moves the window on by at most this many days,
+# or indexes at most this many reminders when the index is built afresh
+OCCURRENCE_SLIDE_DAYS = 1
+OCCURRENCE_BUILD_BATCH = 1000
+
+# Held while a background thread brings the occurrence index up to date
+_refresh_lock = threading.Lock()
+
+
+class _TimedCursor:
+    """Cursor wrapper that reports each statement to an Instrumentation"""
+
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        self._cursor.execute(sql, params)
+        self._metrics.record('sql', sql, time.perf_counter() - started, self._cursor.rowcount)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_params)
+        self._metrics.record('sql', sql, time.perf_counter() - started, self._cursor.rowcount)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ConnectionManager:
+    """Thread-safe access to a SQLite database file
+
+    The database runs in WAL mode: all writes go through one writer
+    connection guarded by a lock, and every thread reads through its own
+    connection, so the UI never waits on the notifier's commits. With a
+    reminder_metrics.Instrumentation as metrics, every statement and commit
+    is timed.
+    """
+
+    def __init__(self, path, cache_size_kb=8192, busy_timeout=30, metrics=None):
+        self.path = path
+        self.cache_size_kb = cache_size_kb
+        self.busy_timeout = busy_timeout
+        self.metrics = metrics
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+
+        # Commit count and time spent in COMMIT (i.e. fsync) on the writer
+        self.commit_count = 0
+        self.commit_seconds = 0.0
+
+        self.writer = self._connect()
+        self.writer.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        # NORMAL only syncs at checkpoints in WAL mode and is still crash-safe
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{self.cache_size_kb}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def reader(self):
+        """Return the calling thread's read connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=1")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def query(self, sql, params=()):
+        """Run a read-only statement and return all rows"""
+        if self.metrics is None:
+            return self.reader().execute(sql, params).fetchall()
+        started = time.perf_counter()
+        rows = self.reader().execute(sql, params).fetchall()
+        self.metrics.record('sql', sql, time.perf_counter() - started, len(rows))
+        return rows
+
+    def query_one(self, sql, params=()):
+        """Run a read-only statement and return the first row"""
+        started = time.perf_counter()
+        cursor = self.reader().execute(sql, params)
+        row = cursor.fetchone()
+        cursor.close()
+        if self.metrics is not None:
+            self.metrics.record('sql', sql, time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    @contextmanager
+    def transaction(self):
+        """Hold the writer for one transaction, committing on success"""
+        with self._write_lock:
+            cursor = self.writer.cursor()
+            try:
+                yield cursor if self.metrics is None else _TimedCursor(cursor, self.metrics)
+                started = time.perf_counter()
+                self.writer.commit()
+                elapsed = time.perf_counter() - started
+                self.commit_seconds += elapsed
+                self.commit_count += 1
+                if self.metrics is not None:
+                    self.metrics.record('commit', 'COMMIT', elapsed)
+            except BaseException:
+                self.writer.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute(self, sql, params=()):
+        """Run a single write statement in its own transaction"""
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def data_version(self):
+        """Return the writer's PRAGMA data_version
+
+        It only changes when another connection or process commits, so
+        this manager's own writes never show up as outside changes.
+        """
+        with self._write_lock:
+            return self.writer.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """Close the writer and every reader connection"""
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+        with self._write_lock:
+            self.writer.close()
+
+
+
+class SettingsCache:
+    """Per-user settings kept in memory for the notification path
+
+    Each user's settings are an immutable tuple that is replaced, never
+    mutated, so the notifier reads them without a lock or a query. Users
+    without a settings row get the table defaults.
+    """
+
+    DEFAULTS = ('light', 1, 0)
+
+    def __init__(self, db):
+        self.db = db
+        self._settings = {}
+
+    def load(self, user_id=None):
+        """Read one user's settings, or every user's when user_id is None"""
+        if user_id is None:
+            rows = self.db.query("SELECT user_id, theme, notification_sound, email_notifications FROM settings")
+            self._settings = {row[0]: tuple(row[1:]) for row in rows}
+            return None
+
+        row = self.db.query_one("""
+            SELECT theme, notification_sound, email_notifications
+            FROM settings WHERE user_id=?
+        """, (user_id,))
+        settings = tuple(row) if row else self.DEFAULTS
+        self._settings[user_id] = settings
+        return settings
+
+    def get(self, user_id):
+        """Return (theme, notification_sound, email_notifications) for a user"""
+        settings = self._settings.get(user_id)
+        if settings is None:
+            settings = self.load(user_id)
+        return settings
+
+    def sound_enabled(self, user_id):
+        """Whether notification sounds are on for a user"""
+        return self.get(user_id)[1] == 1
+
+    def invalidate(self, user_id):
+        """Drop a user's cached settings after they change"""
+        self._settings.pop(user_id, None)
+
+
+def get_columns(cursor, table):
+    """Return the column names of a table"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in cursor.fetchall()]
+
+
+def migrate_reminders(cursor):
+    """Add the materialized due_at and series_start columns and indexes to reminders
+
+    due_at holds the local reminder_date/reminder_time as epoch seconds so the
+    checker and dashboard can use index range scans instead of evaluating
+    datetime(reminder_date || ' ' || reminder_time) for every row.
+    """
+    if 'due_at' not in get_columns(cursor, 'reminders'):
+        cursor.execute("ALTER TABLE reminders ADD COLUMN due_at INTEGER")
+
+        # Backfill rows written before the column existed
+        cursor.execute("""
+            UPDATE reminders
+            SET due_at = CAST(strftime('%s', reminder_date || ' ' || reminder_time, 'utc') AS INTEGER)
+            WHERE due_at IS NULL
+        """)
+        print("Database migrated: Added due_at column")
+
+    # First occurrence of a repeating series; each occurrence is computed
+    # from it so monthly series keep their day of month
+    if 'series_start' not in get_columns(cursor, 'reminders'):
+        cursor.execute("ALTER TABLE reminders ADD COLUMN series_start TEXT")
+        cursor.execute("""
+            UPDATE reminders
+            SET series_start = reminder_date || ' ' || reminder_time
+            WHERE series_start IS NULL
+        """)
+        print("Database migrated: Added series_start column")
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_user_due
+        ON reminders (user_id, status, notified, due_at)
+    """)
+
+    # The background checker looks for due reminders across all users
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_due
+        ON reminders (status, notified, due_at)
+    """)
+
+    # Keyset pagination of the reminders list, with and without a status filter
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_user_date
+        ON reminders (user_id, reminder_date, reminder_time)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_user_status_date
+        ON reminders (user_id, status, reminder_date, reminder_time)
+    """)
+
+
+def migrate_counters(cursor):
+    """Create the per-user dashboard counters and the triggers that maintain them
+
+    reminder_counters holds pending/completed totals per user and
+    reminder_day_counts the number of reminders per user per day, so the
+    dashboard reads a couple of rows instead of counting a user's history.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='reminder_counters'")
+    exists = cursor.fetchone() is not None
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_counters (
+            user_id INTEGER PRIMARY KEY,
+            pending INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_day_counts (
+            user_id INTEGER NOT NULL,
+            reminder_date TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, reminder_date)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_counters_insert
+        AFTER INSERT ON reminders
+        BEGIN
+            INSERT OR IGNORE INTO reminder_counters (user_id) VALUES (NEW.user_id);
+            UPDATE reminder_counters
+            SET pending = pending + (NEW.status = 'pending'),
+                completed = completed + (NEW.status = 'completed')
+            WHERE user_id = NEW.user_id;
+            INSERT INTO reminder_day_counts (user_id, reminder_date, total)
+            VALUES (NEW.user_id, NEW.reminder_date, 1)
+            ON CONFLICT (user_id, reminder_date) DO UPDATE SET total = total + 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_counters_delete
+        AFTER DELETE ON reminders
+        BEGIN
+            UPDATE reminder_counters
+            SET pending = pending - (OLD.status = 'pending'),
+                completed = completed - (OLD.status = 'completed')
+            WHERE user_id = OLD.user_id;
+            UPDATE reminder_day_counts SET total = total - 1
+            WHERE user_id = OLD.user_id AND reminder_date = OLD.reminder_date;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_counters_update
+        AFTER UPDATE OF user_id, status, reminder_date ON reminders
+        BEGIN
+            UPDATE reminder_counters
+            SET pending = pending - (OLD.status = 'pending'),
+                completed = completed - (OLD.status = 'completed')
+            WHERE user_id = OLD.user_id;
+            UPDATE reminder_day_counts SET total = total - 1
+            WHERE user_id = OLD.user_id AND reminder_date = OLD.reminder_date;
+
+            INSERT OR IGNORE INTO reminder_counters (user_id) VALUES (NEW.user_id);
+            UPDATE reminder_counters
+            SET pending = pending + (NEW.status = 'pending'),
+                completed = completed + (NEW.status = 'completed')
+            WHERE user_id = NEW.user_id;
+            INSERT INTO reminder_day_counts (user_id, reminder_date, total)
+            VALUES (NEW.user_id, NEW.reminder_date, 1)
+            ON CONFLICT (user_id, reminder_date) DO UPDATE SET total = total + 1;
+        END
+    """)
+
+    if not exists:
+        # Seed the counters from the existing reminders
+        cursor.execute("""
+            INSERT INTO reminder_counters (user_id, pending, completed)
+            SELECT user_id, SUM(status = 'pending'), SUM(status = 'completed')
+            FROM reminders GROUP BY user_id
+        """)
+        cursor.execute("""
+            INSERT INTO reminder_day_counts (user_id, reminder_date, total)
+            SELECT user_id, reminder_date, COUNT(*)
+            FROM reminders GROUP BY user_id, reminder_date
+        """)
+        print("Database migrated: Added dashboard counters")
+
+
+def migrate_occurrences(cursor):
+    """Create the occurrence index used for calendar range queries
+
+    reminder_occurrences holds one row per occurrence of every reminder
+    inside a rolling window around today, one-off and recurring alike.
+    Triggers only flag changed reminders in reminder_occurrence_dirty;
+    refresh_occurrences() expands them in Python, because the recurrence
+    rules (e.g. month-end clamping) live in reminder_recurrence.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_occurrences (
+            user_id INTEGER NOT NULL,
+            occurs_at INTEGER NOT NULL,
+            reminder_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, occurs_at, reminder_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminder_occurrences_reminder
+        ON reminder_occurrences (reminder_id)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_occurrence_dirty (
+            reminder_id INTEGER PRIMARY KEY
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_occurrence_window (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            start_at INTEGER NOT NULL,
+            end_at INTEGER NOT NULL
+        )
+    """)
+
+    recurring = ", ".join(f"'{repeat_type}'" for repeat_type in RECURRING_TYPES)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_occurrences_insert
+        AFTER INSERT ON reminders
+        BEGIN
+            INSERT OR IGNORE INTO reminder_occurrence_dirty (reminder_id) VALUES (NEW.id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_occurrences_delete
+        AFTER DELETE ON reminders
+        BEGIN
+            DELETE FROM reminder_occurrences WHERE reminder_id = OLD.id;
+            DELETE FROM reminder_occurrence_dirty WHERE reminder_id = OLD.id;
+        END
+    """)
+    # A series is defined by its start and repeat type, so moving a
+    # recurring reminder on to its next occurrence leaves the index alone
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_occurrences_update
+        AFTER UPDATE OF user_id, repeat_type, series_start, due_at ON reminders
+        WHEN NEW.user_id IS NOT OLD.user_id
+            OR NEW.repeat_type IS NOT OLD.repeat_type
+            OR NEW.series_start IS NOT OLD.series_start
+            OR (NEW.due_at IS NOT OLD.due_at AND NEW.repeat_type NOT IN ({recurring}))
+        BEGIN
+            INSERT OR IGNORE INTO reminder_occurrence_dirty (reminder_id) VALUES (NEW.id);
+        END
+    """)
+
+
+def migrate_search(cursor):
+    """Create the FTS5 index over reminder titles and descriptions
+
+    reminders_fts is an external-content table: it stores only the index
+    and reads text from reminders, kept in sync by triggers. SQLite builds
+    without FTS5 keep working; search_reminders() then falls back to LIKE.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='reminders_fts'")
+    exists = cursor.fetchone() is not None
+
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS reminders_fts USING fts5(
+                title, description,
+                content='reminders', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"Full-text search unavailable: {e}")
+        return
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_fts_insert
+        AFTER INSERT ON reminders
+        BEGIN
+            INSERT INTO reminders_fts (rowid, title, description)
+            VALUES (NEW.id, NEW.title, NEW.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_fts_delete
+        AFTER DELETE ON reminders
+        BEGIN
+            INSERT INTO reminders_fts (reminders_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reminders_fts_update
+        AFTER UPDATE OF title, description ON reminders
+        BEGIN
+            INSERT INTO reminders_fts (reminders_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+            INSERT INTO reminders_fts (rowid, title, description)
+            VALUES (NEW.id, NEW.title, NEW.description);
+        END
+    """)
+
+    if not exists:
+        # Index the reminders written before the table existed
+        cursor.execute("INSERT INTO reminders_fts (reminders_fts) VALUES ('rebuild')")
+        print("Database migrated: Added full-text search index")
+
+
+def _series_occurrences(repeat_type, series_start, due_at, start_at, end_at):
+    # Epoch timestamps of one reminder's occurrences in [start_at, end_at)
+    start = parse_series_start(series_start)
+    if start is None or not is_recurring(repeat_type):
+        if due_at is not None and start_at <= due_at < end_at:
+            yield due_at
+        return
+
+    after = datetime.fromtimestamp(start_at) - timedelta(seconds=1)
+    until = datetime.fromtimestamp(end_at)
+    for occurrence in occurrences(start, repeat_type, after=after, until=until):
+        occurs_at = int(occurrence.timestamp())
+        if start_at <= occurs_at < end_at:
+            yield occurs_at
+
+
+def _target_window():
+    # Epoch bounds of the window the index should cover today
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (int((today - timedelta(days=OCCURRENCE_HISTORY_DAYS)).timestamp()),
+            int((today + timedelta(days=OCCURRENCE_HORIZON_DAYS)).timestamp()))
+
+
+def _stored_window(db):
+    # The indexed (start_at, end_at), or None before the index is built
+    return db.query_one("SELECT start_at, end_at FROM reminder_occurrence_window WHERE id=1")
+
+
+def _window_is_stale(window):
+    # The window moves on once it covers less than a week beyond the horizon
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return window is None or window[1] < int((today + timedelta(days=OCCURRENCE_HORIZON_DAYS - 7)).timestamp())
+
+
+def _step_toward(bound, target, days):
+    # Move an epoch day boundary at most days towards target
+    if bound < target:
+        return min(int((datetime.fromtimestamp(bound) + timedelta(days=days)).timestamp()), target)
+    return max(int((datetime.fromtimestamp(bound) - timedelta(days=days)).timestamp()), target)
+
+
+def _insert_occurrences(cursor, rows, start_at, end_at):
+    # Index the occurrences in [start_at, end_at) of (id, user_id,
+    # repeat_type, series_start, due_at) reminder rows
+    cursor.executemany(
+        "INSERT OR IGNORE INTO reminder_occurrences (user_id, occurs_at, reminder_id) VALUES (?, ?, ?)",
+        ((user_id, occurs_at, reminder_id)
+         for reminder_id, user_id, repeat_type, series_start, due_at in rows
+         for occurs_at in _series_occurrences(repeat_type, series_start, due_at, start_at, end_at)))
+
+
+def _expand_occurrences(cursor, start_at, end_at):
+    # Index every reminder's occurrences in [start_at, end_at)
+    recurring = ", ".join("?" * len(RECURRING_TYPES))
+    cursor.execute(f"""
+        SELECT id, user_id, repeat_type, series_start, due_at
+        FROM reminders
+        WHERE repeat_type IN ({recurring}) OR (due_at >= ? AND due_at < ?)
+    """, (*RECURRING_TYPES, start_at, end_at))
+    _insert_occurrences(cursor, cursor.fetchall(), start_at, end_at)
+
+
+def _delete_occurrences(cursor, start_at, end_at):
+    # Remove occurrences in [start_at, end_at) one user at a time, so every
+    # delete is a range of the (user_id, occurs_at) primary key
+    cursor.execute("SELECT MIN(user_id) FROM reminder_occurrences")
+    user_id = cursor.fetchone()[0]
+    while user_id is not None:
+        cursor.execute("DELETE FROM reminder_occurrences WHERE user_id=? AND occurs_at >= ? AND occurs_at < ?",
+                       (user_id, start_at, end_at))
+        cursor.execute("SELECT MIN(user_id) FROM reminder_occurrences WHERE user_id > ?", (user_id,))
+        user_id = cursor.fetchone()[0]
+
+
+def _build_occurrences(db, window, batch_size):
+    # Index every reminder over window in batches of ids. The window row is
+    # only written at the end, so until then readers expand reminders
+    # directly; reminders changed meanwhile are flagged by the triggers and
+    # re-expanded by refresh_dirty_occurrences() afterwards
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM reminder_occurrence_window")
+        cursor.execute("DELETE FROM reminder_occurrences")
+        cursor.execute("DELETE FROM reminder_occurrence_dirty")
+
+    last_id = 0
+    while True:
+        with db.transaction() as cursor:
+            cursor.execute("""
+                SELECT id, user_id, repeat_type, series_start, due_at
+                FROM reminders WHERE id > ? ORDER BY id LIMIT ?
+            """, (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                cursor.execute("INSERT INTO reminder_occurrence_window (id, start_at, end_at) VALUES (1, ?, ?)",
+                               window)
+                return window
+            _insert_occurrences(cursor, rows, *window)
+            last_id = rows[-1][0]
+
+
+def slide_occurrences(db, step_days=OCCURRENCE_SLIDE_DAYS, batch_size=OCCURRENCE_BUILD_BATCH):
+    """Move the occurrence window to today's and return its (start_at, end_at)
+
+    Each transaction moves either end of the window by at most step_days,
+    indexing only the newly covered days and deleting the expired ones, so
+    the writer is never held for long and the stored window always matches
+    the rows in the index. A missing or wholly outdated index is built
+    afresh batch_size reminders at a time.
+    """
+    while True:
+        target = _target_window()
+        with db.transaction() as cursor:
+            cursor.execute("SELECT start_at, end_at FROM reminder_occurrence_window WHERE id=1")
+            window = cursor.fetchone()
+            rebuild = window is None or window[1] <= target[0] or window[0] >= target[1]
+            if not rebuild:
+                start_at, end_at = window
+                if (start_at, end_at) == target:
+                    return target
+
+                new_start = _step_toward(start_at, target[0], step_days)
+                new_end = _step_toward(end_at, target[1], step_days)
+                if new_start > start_at:
+                    _delete_occurrences(cursor, start_at, new_start)
+                elif new_start < start_at:
+                    _expand_occurrences(cursor, new_start, start_at)
+                if new_end > end_at:
+                    _expand_occurrences(cursor, end_at, new_end)
+                elif new_end < end_at:
+                    _delete_occurrences(cursor, new_end, end_at)
+                cursor.execute("UPDATE reminder_occurrence_window SET start_at=?, end_at=? WHERE id=1",
+                               (new_start, new_end))
+        if rebuild:
+            return _build_occurrences(db, target, batch_size)
+
+
+def refresh_dirty_occurrences(db):
+    """Re-expand the reminders flagged by the triggers and return the window
+
+    Returns None while the index has no window yet.
+    """
+    if db.query_one("SELECT 1 FROM reminder_occurrence_dirty LIMIT 1") is None:
+        return _stored_window(db)
+
+    with db.transaction() as cursor:
+        cursor.execute("SELECT start_at, end_at FROM reminder_occurrence_window WHERE id=1")
+        window = cursor.fetchone()
+        if window is None:
+            return None
+        cursor.execute("""
+            SELECT r.id, r.user_id, r.repeat_type, r.series_start, r.due_at
+            FROM reminder_occurrence_dirty d JOIN reminders r ON r.id = d.reminder_id
+        """)
+        rows = cursor.fetchall()
+        cursor.execute("""
+            DELETE FROM reminder_occurrences
+            WHERE reminder_id IN (SELECT reminder_id FROM reminder_occurrence_dirty)
+        """)
+        _insert_occurrences(cursor, rows, *window)
+        cursor.execute("DELETE FROM reminder_occurrence_dirty")
+    return window
+
+
+def refresh_occurrences(db):
+    """Bring the occurrence index up to date and return its (start_at, end_at)
+
+    The window is moved on with slide_occurrences() once it is about a week
+    behind, then the reminders flagged by the triggers are re-expanded.
+    Blocks until done; the GUI uses refresh_occurrences_in_background().
+    """
+    if _window_is_stale(_stored_window(db)):
+        slide_occurrences(db)
+    return refresh_dirty_occurrences(db)
+
+
+def refresh_occurrences_in_background(db):
+    """Run refresh_occurrences(db) on a daemon thread unless one is already running"""
+    if not _refresh_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            refresh_occurrences(db)
+        except Exception as e:
+            print(f"Occurrence index error: {e}")
+        finally:
+            _refresh_lock.release()
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_occurrences(db, user_id, start_at, end_at):
+    """Return a user's reminder occurrences with start_at <= occurs_at < end_at
+
+    Rows are (occurs_at, id, title, category, status) in time order, with
+    occurs_at in epoch seconds. Ranges inside the indexed window are read
+    from the index; anything else is expanded from the reminders directly.
+    Moving the window on is left to a background thread, so the caller only
+    ever waits for the re-expansion of changed reminders.
+    """
+    if _window_is_stale(_stored_window(db)):
+        refresh_occurrences_in_background(db)
+    window = refresh_dirty_occurrences(db)
+    if window is not None and window[0] <= start_at and end_at <= window[1]:
+        return db.query("""
+            SELECT o.occurs_at, r.id, r.title, r.category, r.status
+            FROM reminder_occurrences o JOIN reminders r ON r.id = o.reminder_id
+            WHERE o.user_id=? AND o.occurs_at >= ? AND o.occurs_at < ?
+            ORDER BY o.occurs_at, r.id
+        """, (user_id, start_at, end_at))
+
+    recurring = ", ".join("?" * len(RECURRING_TYPES))
+    rows = db.query(f"""
+        SELECT id, title, category, status, repeat_type, series_start, due_at
+        FROM reminders
+        WHERE user_id=? AND (repeat_type IN ({recurring}) OR (due_at >= ? AND due_at < ?))
+    """, (user_id, *RECURRING_TYPES, start_at, end_at))
+    return sorted((occurs_at, reminder_id, title, category, status)
+                  for reminder_id, title, category, status, repeat_type, series_start, due_at in rows
+                  for occurs_at in _series_occurrences(repeat_type, series_start, due_at, start_at, end_at))
+
+
+def get_dashboard_counts(db, user_id, today):
+    """Return (pending, completed, today) reminder counts for a user
+
+    Reads the trigger-maintained counters, falling back to a single
+    aggregate scan of the user's reminders if they are unavailable.
+    """
+    try:
+        return db.query_one("""
+            SELECT COALESCE(c.pending, 0), COALESCE(c.completed, 0), COALESCE(d.total, 0)
+            FROM (SELECT ? AS user_id) u
+            LEFT JOIN reminder_counters c ON c.user_id = u.user_id
+            LEFT JOIN reminder_day_counts d ON d.user_id = u.user_id AND d.reminder_date = ?
+        """, (user_id, today))
+    except sqlite3.OperationalError:
+        return db.query_one("""
+            SELECT COALESCE(SUM(status = 'pending'), 0),
+                   COALESCE(SUM(status = 'completed'), 0),
+                   COALESCE(SUM(reminder_date = ?), 0)
+            FROM reminders WHERE user_id=?
+        """, (today, user_id))
+
+
+def _fts_query(text):
+    # Every word must match, each as a prefix, with FTS5 syntax quoted away
+    words = [word.replace('"', '""') for word in text.split()]
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_reminders(db, user_id, text, status=None, limit=100):
+    """Return a user's reminders matching text, best matches first
+
+    Rows have the same columns as get_reminders_page(). Matches are ranked
+    by bm25 with title hits weighted above description hits.
+    """
+    query = _fts_query(text)
+    if not query:
+        return []
+
+    status_clause = " AND r.status=?" if status else ""
+    params = [query, user_id] + ([status] if status else []) + [limit]
+    try:
+        return db.query(f"""
+            SELECT r.id, r.title, r.reminder_date, r.reminder_time, r.category, r.status
+            FROM reminders_fts f JOIN reminders r ON r.id = f.rowid
+            WHERE reminders_fts MATCH ? AND r.user_id=?{status_clause}
+            ORDER BY bm25(reminders_fts, 10.0, 1.0)
+            LIMIT ?
+        """, params)
+    except sqlite3.OperationalError:
+        pass
+
+    # No FTS5: every word must appear in the title or description
+    clauses = ["user_id=?"]
+    params = [user_id]
+    for word in text.split():
+        clauses.append("(title LIKE ? OR description LIKE ?)")
+        params.extend([f"%{word}%"] * 2)
+    if status:
+        clauses.append("status=?")
+        params.append(status)
+    params.append(limit)
+    return db.query(f"""
+        SELECT id, title, reminder_date, reminder_time, category, status
+        FROM reminders WHERE {' AND '.join(clauses)}
+        ORDER BY reminder_date DESC, reminder_time DESC, id DESC
+        LIMIT ?
+    """, params)
+
+
+def get_reminders_page(db, user_id, status=None, after=None, limit=100, forward=True):
+    """Return one keyset page of a user's reminders, newest first
+
+    after is the (reminder_date, reminder_time, id) key to continue from.
+    With forward=False the rows just before it are returned, nearest first.
+    """
+    clauses = ["user_id=?"]
+    params = [user_id]
+    if status:
+        clauses.append("status=?")
+        params.append(status)
+    if after is not None:
+        clauses.append("(reminder_date, reminder_time, id) %s (?, ?, ?)" % ("<" if forward else ">"))
+        params.extend(after)
+    order = "DESC" if forward else "ASC"
+    params.append(limit)
+
+    return db.query(f"""
+        SELECT id, title, reminder_date, reminder_time, category, status
+        FROM reminders WHERE {' AND '.join(clauses)}
+        ORDER BY reminder_date {order}, reminder_time {order}, id {order}
+        LIMIT ?
+    """, params)
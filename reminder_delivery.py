@@ -0,0 +1,332 @@
+import platform
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+LINUX_SOUND_FILE = '/usr/share/sounds/freedesktop/stereo/message.oga'
+
+# Digest order: earlier categories are listed first
+CATEGORY_PRIORITY = ('Deadline', 'Class', 'Meeting', 'Event', 'Other', 'Personal')
+# A digest waits this long for room in a full delivery queue before it is
+# refused and its reminders are left for the checker to retry
+DIGEST_QUEUE_WAIT_SECONDS = 5
+# On exit the workers get this long to finish the jobs already queued
+DISPATCHER_STOP_SECONDS = 10
+
+# Desktop notification backend, resolved on the first notification
+_notify = None
+_notify_lock = threading.Lock()
+
+
+class NotificationDispatcher:
+    """Bounded queue of delivery jobs run by a small pool of worker threads
+
+    The reminder checker only enqueues sound and desktop notification jobs,
+    so a slow notification backend or a long sound never holds up the next
+    reminder. When the queue is full new jobs are refused rather than
+    blocking the checker for long; submit_within() waits a bounded time.
+    """
+
+    def __init__(self, workers=4, max_pending=100):
+        self.workers = workers
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.threads = []
+
+    def start(self):
+        """Start the worker threads"""
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self.run, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout=DISPATCHER_STOP_SECONDS):
+        """Let the workers finish queued jobs and wait up to timeout seconds for them to exit
+
+        The workers are daemon threads, so anything still queued when the
+        process exits would otherwise be lost.
+        """
+        deadline = time.monotonic() + timeout
+        threads, self.threads = self.threads, []
+        try:
+            for _ in threads:
+                self.jobs.put(None, timeout=max(deadline - time.monotonic(), 0))
+        except queue.Full:
+            print("Delivery queue still full on exit")
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) without waiting; return False if the queue is full"""
+        return self.submit_within(0, func, *args, **kwargs)
+
+    def submit_within(self, seconds, func, *args, **kwargs):
+        """Queue func(*args, **kwargs), waiting up to seconds for room; return False if it stays full"""
+        try:
+            self.jobs.put((func, args, kwargs), timeout=seconds)
+            return True
+        except queue.Full:
+            print(f"Delivery queue full, dropped {getattr(func, '__name__', func)}")
+            return False
+
+    def run(self):
+        """Worker loop: run jobs until a stop sentinel arrives"""
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    break
+                func, args, kwargs = job
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Delivery job error: {e}")
+            finally:
+                self.jobs.task_done()
+
+
+def category_priority(category):
+    """Sort key for a reminder category, unknown categories last"""
+    try:
+        return CATEGORY_PRIORITY.index(category)
+    except ValueError:
+        return len(CATEGORY_PRIORITY)
+
+
+def format_digest(reminders, max_items=5):
+    """Message body listing (id, title, description, category) reminders"""
+    lines = [f"• {title}" + (f" ({category})" if category else "")
+             for _, title, _, category in reminders[:max_items]]
+    if len(reminders) > max_items:
+        lines.append(f"…and {len(reminders) - max_items} more")
+    return "\n".join(lines)
+
+
+class DigestCoalescer:
+    """Turns bursts of due reminders into rate-limited per-user digests
+
+    add(user, reminders, is_advance_warning) takes (id, title, description,
+    category) tuples. The first batch for a user is passed to emit at once;
+    anything arriving during the next window_seconds is held and emitted as
+    one digest when the window closes, or at stop(). Each user therefore
+    gets at most one notification (and one sound) per window and kind,
+    however many reminders come due. Reminders are emitted in
+    CATEGORY_PRIORITY order.
+
+    emit may return False to refuse a digest, e.g. when the delivery queue
+    is full: add() then returns False so the caller can retry the batch
+    later, and a refused held digest is held for another window.
+    """
+
+    def __init__(self, emit, window_seconds=60):
+        self.emit = emit
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._last_emit = {}
+        self._pending = {}
+        self._timers = {}
+        self._stopped = False
+
+    def add(self, user, reminders, is_advance_warning=False):
+        """Emit reminders now, or hold them for the user's next digest
+
+        Returns False if emit refused them, True once they are emitted or held.
+        """
+        if not reminders:
+            return True
+        key = (user['id'], is_advance_warning)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._pending:
+                self._pending[key][1].extend(reminders)
+                return True
+
+            last = self._last_emit.get(key)
+            if last is not None and now - last < self.window_seconds:
+                self._hold(key, user, reminders, last + self.window_seconds - now)
+                return True
+            self._last_emit[key] = now
+        if self._emit(user, reminders, is_advance_warning):
+            return True
+
+        with self._lock:
+            # Nothing was shown, so the retry should not wait for a window
+            if self._last_emit.get(key) == now:
+                if last is None:
+                    del self._last_emit[key]
+                else:
+                    self._last_emit[key] = last
+        return False
+
+    def flush(self, key):
+        """Emit the digest held for a (user_id, is_advance_warning) key"""
+        with self._lock:
+            self._timers.pop(key, None)
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return
+            self._last_emit[key] = time.monotonic()
+        user, reminders = pending
+        if not self._emit(user, reminders, key[1]):
+            # Already marked delivered, so keep them for the next window
+            with self._lock:
+                if not self._stopped:
+                    self._hold(key, user, reminders, self.window_seconds)
+                    return
+            print(f"Digest of {len(reminders)} reminder(s) could not be delivered on exit")
+
+    def _hold(self, key, user, reminders, delay):
+        # Called with the lock held; adds to the key's digest or starts one
+        if key in self._pending:
+            self._pending[key][1].extend(reminders)
+            return
+        self._pending[key] = (user, list(reminders))
+        timer = threading.Timer(delay, self.flush, (key,))
+        timer.daemon = True
+        self._timers[key] = timer
+        timer.start()
+
+    def stop(self):
+        """Cancel the timers and emit every held digest now
+
+        The held reminders are already marked delivered, so dropping them
+        on exit would lose them for good.
+        """
+        with self._lock:
+            self._stopped = True
+            for timer in self._timers.values():
+                timer.cancel()
+            pending = self._pending
+            self._timers = {}
+            self._pending = {}
+        for key, (user, reminders) in pending.items():
+            if not self._emit(user, reminders, key[1]):
+                print(f"Digest of {len(reminders)} reminder(s) could not be delivered on exit")
+
+    def _emit(self, user, reminders, is_advance_warning):
+        # False only if emit refused the digest; a failing backend counts as
+        # delivered so it is not retried forever
+        try:
+            return self.emit(user, sorted(reminders, key=lambda reminder: category_priority(reminder[3])),
+                             is_advance_warning) is not False
+        except Exception as e:
+            print(f"Digest error: {e}")
+            return True
+
+
+def play_sound_file(player, path, repeat=1):
+    """Play a sound file repeat times in a background process and return at once"""
+    if repeat > 1:
+        command = ['sh', '-c', 'for _ in $(seq "$2"); do "$0" "$1"; done', player, path, str(repeat)]
+    else:
+        command = [player, path]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _notify_send(title, message, app_name, timeout):
+    subprocess.Popen(['notify-send', '-a', app_name, '-t', str(timeout * 1000), title, message],
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _osascript(title, message, app_name, timeout):
+    script = 'display notification (item 2 of argv) with title (item 1 of argv)'
+    subprocess.Popen(['osascript', '-e', f'on run argv\n{script}\nend run', title, message],
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _print_notification(title, message, app_name, timeout):
+    print(f"[{app_name}] {title}: {message}")
+
+
+def _resolve_notify():
+    # plyer is preferred; without it use the platform's command line
+    # notifier, and as a last resort print to the console
+    try:
+        from plyer import notification
+    except ImportError:
+        system = platform.system()
+        if system == "Linux" and shutil.which('notify-send'):
+            return _notify_send
+        if system == "Darwin" and shutil.which('osascript'):
+            return _osascript
+        return _print_notification
+
+    def notify(title, message, app_name, timeout):
+        notification.notify(title=title, message=message, app_name=app_name, timeout=timeout)
+    return notify
+
+
+def show_notification(title, message, app_name="Teacher Reminder System", timeout=10):
+    """Show a desktop notification, importing the backend on first use"""
+    global _notify
+    if _notify is None:
+        with _notify_lock:
+            if _notify is None:
+                _notify = _resolve_notify()
+    _notify(title, message, app_name, timeout)
+
+
+def play_alert(urgent=False):
+    """Start the platform alert sound without waiting for it to finish
+
+    urgent alerts are louder or repeated. winsound is only imported on
+    Windows and only when a sound is played; machines without a sound
+    player get the terminal bell.
+    """
+    system = platform.system()
+    if system == "Windows":
+        import winsound
+        alias = "SystemExclamation" if urgent else "SystemAsterisk"
+        winsound.PlaySound(alias, winsound.SND_ALIAS | winsound.SND_ASYNC)
+    elif system == "Darwin":
+        if urgent:
+            play_sound_file('afplay', '/System/Library/Sounds/Glass.aiff', repeat=3)
+        else:
+            play_sound_file('afplay', '/System/Library/Sounds/Tink.aiff')
+    elif shutil.which('paplay'):
+        play_sound_file('paplay', LINUX_SOUND_FILE, repeat=3 if urgent else 1)
+    else:
+        print('\a', end='', flush=True)
+
+
+def play_notification_sound(settings, user_id, is_advance_warning=False):
+    """Start the alert sound if the user has sound enabled, without waiting for it"""
+    if not settings.sound_enabled(user_id):
+        return
+    try:
+        # Softer sound for the advance warning, louder and repeated for the reminder
+        play_alert(urgent=not is_advance_warning)
+    except Exception as e:
+        print(f"Sound error: {e}")
+
+
+def notify_digest(dispatcher, settings, user, reminders, is_advance_warning, advance_minutes=10):
+    """Queue one sound and one desktop notification for a digest of reminders
+
+    settings is a reminder_db.SettingsCache; reminders are (id, title,
+    description, category) tuples already in digest order. Returns False
+    if the notification could not be queued.
+    """
+    dispatcher.submit(play_notification_sound, settings, user['id'], is_advance_warning)
+
+    if is_advance_warning:
+        if len(reminders) == 1:
+            _, title, description, _ = reminders[0]
+            title = f"🔔 Upcoming: {title}"
+            message = f"In {advance_minutes} minutes: {description if description else 'Reminder scheduled'}"
+        else:
+            title = f"🔔 {len(reminders)} reminders in {advance_minutes} minutes"
+            message = format_digest(reminders)
+        timeout = 10
+    else:
+        if len(reminders) == 1:
+            _, title, description, _ = reminders[0]
+            title = f"⏰ REMINDER: {title}"
+            message = description if description else "You have a pending task NOW!"
+        else:
+            title = f"⏰ {len(reminders)} REMINDERS NOW"
+            message = format_digest(reminders)
+        timeout = 15
+
+    return dispatcher.submit_within(DIGEST_QUEUE_WAIT_SECONDS, show_notification, title, message,
+                                    timeout=timeout)
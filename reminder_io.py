@@ -0,0 +1,404 @@
+"""Bulk import and export of reminders as CSV, JSON Lines and iCalendar
+
+Imports read files as a stream of records and insert them in fixed-size
+executemany batches; exports step through a cursor with fetchmany and
+write each batch as it arrives. Memory use does not grow with the file or
+the table either way. From the command line:
+
+    python -m reminder_io import --user USERNAME FILE
+    python -m reminder_io export [--user USERNAME] FILE
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
+
+from reminder_recurrence import REPEAT_TYPES
+
+DB_PATH = 'teacher_reminders.db'
+IMPORT_CHUNK_SIZE = 5000
+# Page cache for command line imports, so index updates stay in memory
+IMPORT_CACHE_SIZE_KB = 64 * 1024
+EXPORT_BATCH_SIZE = 1000
+DEFAULT_CATEGORY = "Class"
+DEFAULT_TIME = "09:00"
+
+_ICS_FREQUENCIES = {'DAILY': 'daily', 'WEEKLY': 'weekly', 'MONTHLY': 'monthly'}
+
+
+# Imports repeat the same dates and times many times over, and strptime is
+# by far the slowest step of validating a row
+@lru_cache(maxsize=4096)
+def _parse_date(date):
+    return datetime.strptime(date, '%Y-%m-%d')
+
+
+@lru_cache(maxsize=2048)
+def _parse_time(time_val):
+    return datetime.strptime(time_val, '%H:%M')
+
+
+def validate_reminder(title, description, date, time_val, category=None, repeat=None):
+    """Check a reminder like the add form does and return its row values
+
+    Returns (title, description, reminder_date, reminder_time, category,
+    repeat_type, due_at, series_start) or raises ValueError with the
+    message the form shows.
+    """
+    title = (title or "").strip()
+    date = (date or "").strip()
+    time_val = (time_val or "").strip()
+    if not title or not date or not time_val:
+        raise ValueError("Title, date, and time are required!")
+
+    try:
+        # Validate date and time
+        day = _parse_date(date)
+        clock = _parse_time(time_val)
+    except ValueError:
+        raise ValueError("Invalid date or time format!")
+    due_at = int(day.replace(hour=clock.hour, minute=clock.minute).timestamp())
+    # Stored zero-padded: list paging and the per-day counters compare them as text
+    date = day.strftime('%Y-%m-%d')
+    time_val = clock.strftime('%H:%M')
+
+    repeat = (repeat or "once").strip().lower()
+    if repeat not in REPEAT_TYPES:
+        raise ValueError(f"Invalid repeat type: {repeat}")
+
+    return (title, (description or "").strip(), date, time_val, (category or DEFAULT_CATEGORY).strip(),
+            repeat, due_at, f"{date} {time_val}")
+
+
+def _field(record, *names):
+    for name in names:
+        value = record.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _from_mapping(record):
+    return (_field(record, 'title', 'Title'),
+            _field(record, 'description', 'Description'),
+            _field(record, 'reminder_date', 'date', 'Date'),
+            _field(record, 'reminder_time', 'time', 'Time'),
+            _field(record, 'category', 'Category'),
+            _field(record, 'repeat_type', 'repeat', 'Repeat'))
+
+
+def read_csv(lines):
+    """Yield (line_number, fields) from CSV text with a header row"""
+    reader = csv.DictReader(lines)
+    for record in reader:
+        yield reader.line_num, _from_mapping(record)
+
+
+def read_jsonl(lines):
+    """Yield (line_number, fields) from one JSON object per line"""
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        if isinstance(record, dict):
+            yield line_number, _from_mapping(record)
+        else:
+            yield line_number, ValueError("Expected a JSON object")
+
+
+def _unfold(lines):
+    # iCalendar continues long lines on the next line after a space or tab
+    current, start = None, 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, line_number
+    if current is not None:
+        yield start, current
+
+
+def _ics_text(value):
+    return (value.replace('\\n', '\n').replace('\\N', '\n')
+            .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\'))
+
+
+def _ics_datetime(value, params):
+    # DTSTART as a UTC time, a floating local time or an all-day date
+    if 'VALUE=DATE' in params or len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d').strftime('%Y-%m-%d'), DEFAULT_TIME
+    if value.endswith('Z'):
+        moment = datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc).astimezone()
+    else:
+        moment = datetime.strptime(value[:15], '%Y%m%dT%H%M%S')
+    return moment.strftime('%Y-%m-%d'), moment.strftime('%H:%M')
+
+
+def _ics_repeat(rule):
+    # Only plain "every day/week/month from DTSTART" rules map onto repeat_type
+    parts = dict(part.split('=', 1) for part in rule.split(';') if '=' in part)
+    if (parts.get('FREQ') not in _ICS_FREQUENCIES or parts.get('INTERVAL', '1') != '1'
+            or ',' in parts.get('BYDAY', '') or set(parts) - {'FREQ', 'INTERVAL', 'BYDAY', 'WKST'}):
+        raise ValueError(f"Unsupported recurrence rule: {rule}")
+    return _ICS_FREQUENCIES[parts['FREQ']]
+
+
+def read_ics(lines):
+    """Yield (line_number, fields) for each VEVENT of an iCalendar file
+
+    Unparseable events are yielded as (line_number, ValueError) so the
+    importer can report them and carry on.
+    """
+    event = None
+    for line_number, line in _unfold(lines):
+        name, _, value = line.partition(':')
+        name, _, params = name.partition(';')
+        name = name.upper()
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = {'line': line_number}
+        elif name == 'END' and value.upper() == 'VEVENT' and event is not None:
+            try:
+                date, time_val = None, None
+                if 'DTSTART' in event:
+                    date, time_val = _ics_datetime(*event['DTSTART'])
+                repeat = _ics_repeat(event['RRULE'][0]) if 'RRULE' in event else None
+            except ValueError as e:
+                yield event['line'], e
+            else:
+                category = event['CATEGORIES'][0].split(',')[0] if 'CATEGORIES' in event else None
+                yield event['line'], (_ics_text(event.get('SUMMARY', ('',))[0]),
+                                      _ics_text(event.get('DESCRIPTION', ('',))[0]),
+                                      date, time_val, category and _ics_text(category), repeat)
+            event = None
+        elif event is not None and name not in event:
+            event[name] = (value, params.upper())
+
+
+READERS = {'.csv': read_csv, '.jsonl': read_jsonl, '.ndjson': read_jsonl, '.ics': read_ics}
+
+
+def read_reminders(path):
+    """Yield (line_number, fields) from a file, choosing the format by extension"""
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"Unsupported file type: {path}")
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from reader(f)
+
+
+def import_reminders(db, user_id, records, chunk_size=IMPORT_CHUNK_SIZE, max_errors=20):
+    """Validate and insert a stream of (line_number, fields) records for a user
+
+    Rows are written in one transaction per chunk_size valid records.
+    Returns (imported, rejected, errors), where errors holds the
+    (line_number, message) pairs of the first max_errors rejected records.
+    """
+    imported = 0
+    rejected = 0
+    errors = []
+
+    def valid_rows():
+        nonlocal rejected
+        for line_number, fields in records:
+            try:
+                if isinstance(fields, Exception):
+                    raise fields
+                row = (user_id,) + validate_reminder(*fields)
+            except (ValueError, TypeError) as e:
+                rejected += 1
+                if len(errors) < max_errors:
+                    errors.append((line_number, str(e)))
+            else:
+                yield row
+
+    rows = valid_rows()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        with db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT INTO reminders (user_id, title, description, reminder_date, reminder_time,
+                                       category, repeat_type, due_at, series_start)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, chunk)
+        imported += len(chunk)
+    return imported, rejected, errors
+
+
+EXPORT_COLUMNS = ('id', 'username', 'title', 'description', 'reminder_date', 'reminder_time',
+                  'category', 'repeat_type', 'status', 'notified', 'created_at')
+
+
+def iter_reminders(db, user_id=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield reminder rows (EXPORT_COLUMNS) fetched batch_size at a time"""
+    sql = """
+        SELECT r.id, u.username, r.title, r.description, r.reminder_date, r.reminder_time,
+               r.category, r.repeat_type, r.status, r.notified, r.created_at
+        FROM reminders r LEFT JOIN users u ON u.id = r.user_id
+    """
+    params = ()
+    if user_id is not None:
+        sql += " WHERE r.user_id=?"
+        params = (user_id,)
+    cursor = db.reader().execute(sql + " ORDER BY r.id", params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def write_csv(rows, f):
+    """Write rows as CSV with a header line"""
+    writer = csv.writer(f)
+    writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(rows)
+
+
+def write_jsonl(rows, f):
+    """Write rows as one JSON object per line"""
+    for row in rows:
+        f.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+        f.write("\n")
+
+
+def _ics_escape(value):
+    return (str(value or "").replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _ics_fold(line):
+    # Lines longer than 75 octets continue on the next line after a space
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while encoded:
+        size = 75 if not parts else 74
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(encoded[:size].decode('utf-8'))
+        encoded = encoded[size:]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def write_ics(rows, f):
+    """Write rows as an iCalendar file with one VEVENT per reminder"""
+    frequencies = {repeat: freq for freq, repeat in _ICS_FREQUENCIES.items()}
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Teacher Reminder System//EN\r\n")
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        try:
+            start = datetime.strptime(f"{record['reminder_date']} {record['reminder_time']}", '%Y-%m-%d %H:%M')
+        except (TypeError, ValueError):
+            continue
+        lines = ["BEGIN:VEVENT",
+                 f"UID:reminder-{record['id']}@teacher-reminder",
+                 f"DTSTAMP:{stamp}",
+                 f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+                 f"SUMMARY:{_ics_escape(record['title'])}"]
+        if record['description']:
+            lines.append(f"DESCRIPTION:{_ics_escape(record['description'])}")
+        if record['category']:
+            lines.append(f"CATEGORIES:{_ics_escape(record['category'])}")
+        if record['repeat_type'] in frequencies:
+            lines.append(f"RRULE:FREQ={frequencies[record['repeat_type']]}")
+        lines.append(f"X-REMINDER-STATUS:{_ics_escape(record['status'])}")
+        lines.append("END:VEVENT")
+        f.write("".join(_ics_fold(line) for line in lines))
+    f.write("END:VCALENDAR\r\n")
+
+
+WRITERS = {'.csv': write_csv, '.jsonl': write_jsonl, '.ndjson': write_jsonl, '.ics': write_ics}
+
+
+def export_reminders(db, path, user_id=None):
+    """Stream reminders (one user's, or everyone's) to a file; return the row count"""
+    writer = WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer is None:
+        raise ValueError(f"Unsupported file type: {path}")
+
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer(counted(iter_reminders(db, user_id)), f)
+    return count
+
+
+def find_user(db, username):
+    """Return the id of a user by username, or None"""
+    row = db.query_one("SELECT id FROM users WHERE username=?", (username,))
+    return row[0] if row else None
+
+
+def main(argv=None):
+    # Imported here so the GUI can use this module without opening a database
+    from reminder_db import (ConnectionManager, migrate_counters, migrate_occurrences, migrate_reminders,
+                             migrate_search)
+
+    parser = argparse.ArgumentParser(description="Import or export teacher reminders")
+    parser.add_argument("--db", default=DB_PATH, help="path to the reminders database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="import reminders from .csv, .jsonl or .ics")
+    import_parser.add_argument("--user", required=True, help="username that will own the reminders")
+    import_parser.add_argument("path")
+
+    export_parser = commands.add_parser("export", help="export reminders to .csv, .jsonl or .ics")
+    export_parser.add_argument("--user", help="only export this user's reminders")
+    export_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    db = ConnectionManager(args.db, cache_size_kb=IMPORT_CACHE_SIZE_KB)
+    try:
+        with db.transaction() as cursor:
+            migrate_reminders(cursor)
+            migrate_counters(cursor)
+            migrate_occurrences(cursor)
+            migrate_search(cursor)
+
+        user_id = find_user(db, args.user) if args.user else None
+        if args.user and user_id is None:
+            print(f"Unknown user: {args.user}")
+            return 1
+
+        started = time.perf_counter()
+        if args.command == "export":
+            count = export_reminders(db, args.path, user_id)
+            print(f"Exported {count} reminders in {time.perf_counter() - started:.2f} s")
+            return 0
+
+        imported, rejected, errors = import_reminders(db, user_id, read_reminders(args.path))
+        print(f"Imported {imported} reminders in {time.perf_counter() - started:.2f} s, rejected {rejected}")
+        for line_number, message in errors:
+            print(f"  line {line_number}: {message}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""APScheduler job store kept in a table of an SQLite database
+
+Jobs survive restarts without SQLAlchemy: each job's pickled state is
+stored in scheduler_jobs next to its next run time. Only imported when
+APScheduler itself is installed.
+"""
+import pickle
+import sqlite3
+import threading
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+
+class SQLiteJobStore(BaseJobStore):
+    """Stores jobs in the scheduler_jobs table of the database at path"""
+
+    def __init__(self, path, table='scheduler_jobs', pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.path = path
+        self.table = table
+        self.pickle_protocol = pickle_protocol
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    id TEXT PRIMARY KEY,
+                    next_run_time REAL,
+                    job_state BLOB NOT NULL
+                )
+            """)
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_next_run_time "
+                              f"ON {self.table} (next_run_time)")
+
+    def shutdown(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def lookup_job(self, job_id):
+        jobs = self._get_jobs("WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        rows = self._query(f"""
+            SELECT next_run_time FROM {self.table}
+            WHERE next_run_time IS NOT NULL ORDER BY next_run_time LIMIT 1
+        """)
+        return utc_timestamp_to_datetime(rows[0][0]) if rows else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(f"INSERT INTO {self.table} (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                                  (job.id, datetime_to_utc_timestamp(job.next_run_time),
+                                   pickle.dumps(job.__getstate__(), self.pickle_protocol)))
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        with self.lock, self.conn:
+            cursor = self.conn.execute(f"UPDATE {self.table} SET next_run_time = ?, job_state = ? WHERE id = ?",
+                                       (datetime_to_utc_timestamp(job.next_run_time),
+                                        pickle.dumps(job.__getstate__(), self.pickle_protocol), job.id))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with self.lock, self.conn:
+            cursor = self.conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (job_id,))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with self.lock, self.conn:
+            self.conn.execute(f"DELETE FROM {self.table}")
+
+    def _get_jobs(self, where="", params=()):
+        rows = self._query(f"SELECT id, job_state FROM {self.table} {where} "
+                           f"ORDER BY next_run_time IS NULL, next_run_time", params)
+
+        jobs = []
+        broken = []
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except Exception:
+                # A job whose function no longer exists can never run again
+                self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                broken.append((job_id,))
+        if broken:
+            with self.lock, self.conn:
+                self.conn.executemany(f"DELETE FROM {self.table} WHERE id = ?", broken)
+        return jobs
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            # The scheduler thread may poll once more after shutdown()
+            if self.conn is None:
+                return []
+            return self.conn.execute(sql, params).fetchall()
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (path={self.path})>"
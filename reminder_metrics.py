@@ -0,0 +1,150 @@
+"""Latency histograms for SQL statements and screen builds, with a slow log
+
+An Instrumentation object is handed to ConnectionManager and ViewRegistry,
+which report every statement and every screen build or refresh to it.
+Timings are kept per statement text in fixed-bucket histograms along with
+row counts; any single operation slower than the threshold is appended to
+the slow-operation log as it happens. close() appends a summary of the
+whole session to the same file.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+SLOW_LOG_PATH = 'slow_operations.log'
+SLOW_THRESHOLD_MS = 50
+# Upper bounds of the histogram buckets in milliseconds; the last bucket is open
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Collapse whitespace so one statement always gets one histogram"""
+    return " ".join(sql.split())
+
+
+class Histogram:
+    """Latency distribution and row counts of one kind of operation"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def add(self, ms, rows=None):
+        index = 0
+        while index < len(BUCKET_BOUNDS_MS) and ms > BUCKET_BOUNDS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if rows is not None and rows > 0:
+            self.rows += rows
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return 0.0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "buckets": dict(zip([f"<={bound}" for bound in BUCKET_BOUNDS_MS] + ["inf"], self.buckets)),
+        }
+
+
+class Instrumentation:
+    """Collects operation timings from any thread
+
+    Operations are keyed by (kind, name): kind is 'sql', 'commit',
+    'delivery' or 'screen', name the normalised statement, the delivery
+    step or the screen and phase.
+    """
+
+    def __init__(self, slow_ms=SLOW_THRESHOLD_MS, slow_log_path=SLOW_LOG_PATH):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self.histograms = {}
+        self.slow_count = 0
+        self._lock = threading.Lock()
+        self._log = None
+
+    def record(self, kind, name, seconds, rows=None):
+        """Add one timed operation and log it if it was slow"""
+        if kind == 'sql':
+            name = normalize_sql(name)
+        ms = seconds * 1000
+        with self._lock:
+            histogram = self.histograms.get((kind, name))
+            if histogram is None:
+                histogram = self.histograms[(kind, name)] = Histogram()
+            histogram.add(ms, rows)
+            if ms >= self.slow_ms:
+                self.slow_count += 1
+                self._write(f"{datetime.now().isoformat(timespec='milliseconds')}\t{kind}\t"
+                            f"{ms:.1f} ms\trows={'' if rows is None else rows}\t{name}")
+
+    @contextmanager
+    def timed(self, kind, name):
+        """Time the body of a with block as one operation"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - started)
+
+    def snapshot(self):
+        """Return {kind: {name: histogram dict}} for everything recorded so far"""
+        with self._lock:
+            result = {}
+            for (kind, name), histogram in self.histograms.items():
+                result.setdefault(kind, {})[name] = histogram.to_dict()
+            return result
+
+    def report(self, limit=20):
+        """Text table of the operations with the most total time"""
+        with self._lock:
+            items = sorted(self.histograms.items(), key=lambda item: item[1].total_ms, reverse=True)
+            lines = [f"{'total ms':>10} {'count':>7} {'mean':>8} {'p95':>8} {'max':>8} {'rows':>8}  operation"]
+            for (kind, name), histogram in items[:limit]:
+                stats = histogram.to_dict()
+                lines.append(f"{stats['total_ms']:>10.1f} {stats['count']:>7} {stats['mean_ms']:>8.2f} "
+                             f"{stats['p95_ms']:>8} {stats['max_ms']:>8.1f} {stats['rows']:>8}  "
+                             f"{kind}: {name[:100]}")
+            lines.append(f"{self.slow_count} operation(s) over {self.slow_ms} ms")
+            return "\n".join(lines)
+
+    def close(self):
+        """Append the session summary to the slow-operation log and close it"""
+        report = self.report()
+        with self._lock:
+            self._write(f"{datetime.now().isoformat(timespec='seconds')}\tsession summary\n{report}\n")
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def _write(self, line):
+        # Called with the lock held; the file is only opened once something is slow
+        try:
+            if self._log is None:
+                self._log = open(self.slow_log_path, 'a', encoding='utf-8')
+            self._log.write(line + "\n")
+            self._log.flush()
+        except OSError as e:
+            print(f"Slow log error: {e}")
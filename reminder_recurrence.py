@@ -0,0 +1,83 @@
+import calendar
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+REPEAT_TYPES = ('once', 'daily', 'weekly', 'monthly')
+RECURRING_TYPES = ('daily', 'weekly', 'monthly')
+SERIES_FORMAT = '%Y-%m-%d %H:%M'
+
+_STEPS = {'daily': timedelta(days=1), 'weekly': timedelta(weeks=1)}
+
+
+def is_recurring(repeat_type):
+    """Whether a repeat_type/recurring value describes a repeating series"""
+    return repeat_type in RECURRING_TYPES
+
+
+def add_months(start, months):
+    """Move start by whole months, clamping the day to the end of short months"""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+
+def occurrence_at(start, repeat_type, index):
+    """Return the index-th occurrence of a series, counting start as 0
+
+    Every occurrence is computed from the series start rather than from the
+    previous occurrence, so a series on the 31st comes back to the 31st
+    after passing through shorter months.
+    """
+    if repeat_type == 'monthly':
+        return add_months(start, index)
+    return start + _STEPS[repeat_type] * index
+
+
+def _first_index_after(start, repeat_type, after):
+    # Jump close to the first occurrence after `after` instead of walking
+    # the series from the start; the caller steps forward from here
+    if after is None or after < start:
+        return 0
+    if repeat_type == 'monthly':
+        return max((after.year - start.year) * 12 + after.month - start.month - 1, 0)
+    return max((after - start) // _STEPS[repeat_type], 0)
+
+
+def occurrences(start, repeat_type, after=None, until=None):
+    """Yield occurrence datetimes of a series lazily, in order
+
+    Only occurrences strictly after `after` and no later than `until` are
+    produced; without `until` a recurring series is unbounded. Non-repeating
+    reminders yield their single occurrence.
+    """
+    if not is_recurring(repeat_type):
+        if (after is None or start > after) and (until is None or start <= until):
+            yield start
+        return
+
+    index = _first_index_after(start, repeat_type, after)
+    while True:
+        occurrence = occurrence_at(start, repeat_type, index)
+        if until is not None and occurrence > until:
+            return
+        if after is None or occurrence > after:
+            yield occurrence
+        index += 1
+
+
+def next_occurrence(start, repeat_type, after):
+    """Return the first occurrence strictly after `after`, or None"""
+    return next(occurrences(start, repeat_type, after=after), None)
+
+
+# Series starts repeat a lot (the same lesson times), and the occurrence
+# index parses every recurring reminder's start on each pass
+@lru_cache(maxsize=4096)
+def parse_series_start(value):
+    """Parse a stored 'YYYY-MM-DD HH:MM' series start, or return None"""
+    try:
+        return datetime.strptime(value, SERIES_FORMAT)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,333 @@
+import heapq
+import threading
+import time
+from datetime import datetime
+from itertools import groupby
+
+from reminder_recurrence import is_recurring, next_occurrence, parse_series_start
+
+# Condition waits run on the monotonic clock, which stops while the machine
+# is suspended; waking at least this often re-checks the wall clock so a
+# laptop that slept is never late by more than this
+MAX_WAIT_SECONDS = 30
+# Reminders the delivery stage refused (e.g. a full queue) are tried again after this
+DELIVERY_RETRY_SECONDS = 15
+
+
+class ReminderScheduler:
+    """In-memory min-heap of upcoming reminder deliveries keyed on due time
+
+    Keys are (reminder_id, kind) tuples, e.g. (12, 'due') or (12, 'advance').
+    Rescheduling or cancelling a key only updates the entry map; stale heap
+    entries are discarded lazily when they reach the top of the heap.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._cond = threading.Condition()
+        self._running = True
+
+    def schedule(self, key, due_at):
+        """Add or move a key to fire at the epoch timestamp due_at"""
+        with self._cond:
+            self._entries[key] = due_at
+            heapq.heappush(self._heap, (due_at, key))
+            # Wake the waiting thread in case this is now the earliest item
+            self._cond.notify_all()
+
+    def cancel(self, key):
+        """Forget a scheduled key (completed or deleted reminders)"""
+        with self._cond:
+            if self._entries.pop(key, None) is not None:
+                self._cond.notify_all()
+
+    def load(self, items):
+        """Replace the whole schedule with (key, due_at) pairs"""
+        with self._cond:
+            self._entries = dict(items)
+            self._heap = [(due_at, key) for key, due_at in self._entries.items()]
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def clear(self):
+        """Drop every scheduled key"""
+        self.load([])
+
+    def stop(self):
+        """Release the waiting thread so it can exit"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _discard_stale(self):
+        while self._heap:
+            due_at, key = self._heap[0]
+            if self._entries.get(key) == due_at:
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """Return the earliest (due_at, key) pair, or None when idle"""
+        with self._cond:
+            self._discard_stale()
+            return self._heap[0] if self._heap else None
+
+    def wait_for_due(self):
+        """Block until at least one key is due and return all due keys
+
+        Sleeps until the earliest entry, at most MAX_WAIT_SECONDS at a time,
+        and is woken early whenever the schedule changes. Returns None once
+        stopped.
+        """
+        with self._cond:
+            while self._running:
+                self._discard_stale()
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._cond.wait(min(delay, MAX_WAIT_SECONDS))
+                    continue
+
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due_at, key = heapq.heappop(self._heap)
+                    if self._entries.get(key) == due_at:
+                        del self._entries[key]
+                        due.append(key)
+                    self._discard_stale()
+                if due:
+                    return due
+            return None
+
+
+
+class TimerScheduler:
+    """Fallback for APScheduler's BackgroundScheduler when it is not installed
+
+    Supports the one-shot jobs the apps use: add_job(func, trigger='date',
+    run_date=..., args=..., id=...), remove_job, start and shutdown. Jobs
+    run one after another on a single thread driven by a ReminderScheduler.
+    """
+
+    def __init__(self):
+        self.scheduler = ReminderScheduler()
+        self.jobs = {}
+        self.thread = None
+
+    def add_job(self, func, trigger='date', run_date=None, args=(), id=None, **kwargs):
+        self.jobs[id] = (func, args)
+        self.scheduler.schedule(id, run_date.timestamp())
+
+    def remove_job(self, job_id):
+        if self.jobs.pop(job_id, None) is None:
+            raise KeyError(job_id)
+        self.scheduler.cancel(job_id)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def shutdown(self, wait=True):
+        self.scheduler.stop()
+
+    def run(self):
+        while True:
+            due = self.scheduler.wait_for_due()
+            if due is None:
+                break
+            for job_id in due:
+                func, args = self.jobs.pop(job_id, (None, ()))
+                if func is None:
+                    continue
+                try:
+                    func(*args)
+                except Exception as e:
+                    print(f"Job {job_id} error: {e}")
+
+
+class ReminderNotifier:
+    """Background checker that delivers every user's due reminders
+
+    One indexed query per wake-up collects the due reminders of all users,
+    which are handed to deliver(user, reminders, is_advance_warning) grouped
+    per user as (id, title, description, category) tuples. deliver returns
+    the ids it delivered so they can be marked; the rest stay undelivered
+    and are tried again after DELIVERY_RETRY_SECONDS. Delivered reminders of a
+    daily/weekly/monthly series are moved on to their next occurrence
+    rather than marked notified.
+    """
+
+    def __init__(self, db, deliver, advance_seconds=0):
+        self.db = db
+        self.deliver = deliver
+        self.advance_seconds = advance_seconds
+        self.scheduler = ReminderScheduler()
+        self.thread = None
+
+    def start(self):
+        """Load every user's pending reminders and start the checker thread"""
+        self.load()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the checker thread, letting a check in progress finish its deliveries"""
+        self.scheduler.stop()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def load(self):
+        """Load all undelivered reminders into the scheduler"""
+        if self.advance_seconds:
+            rows = self.db.query("""
+                SELECT id, due_at, advance_notified FROM reminders
+                WHERE status='pending' AND notified=0 AND due_at IS NOT NULL
+            """)
+        else:
+            rows = self.db.query("""
+                SELECT id, due_at, 1 FROM reminders
+                WHERE status='pending' AND notified=0 AND due_at IS NOT NULL
+            """)
+
+        now = time.time()
+        items = []
+        for reminder_id, due_at, advance_notified in rows:
+            items.append(((reminder_id, 'due'), due_at))
+            if not advance_notified and due_at > now:
+                items.append(((reminder_id, 'advance'), due_at - self.advance_seconds))
+
+        self.scheduler.load(items)
+
+    def schedule(self, reminder_id, due_at):
+        """Queue a new or edited reminder"""
+        self.scheduler.schedule((reminder_id, 'due'), due_at)
+        if self.advance_seconds and due_at > time.time():
+            self.scheduler.schedule((reminder_id, 'advance'), due_at - self.advance_seconds)
+
+    def cancel(self, reminder_id):
+        """Forget a completed or deleted reminder"""
+        self.scheduler.cancel((reminder_id, 'due'))
+        self.scheduler.cancel((reminder_id, 'advance'))
+
+    def run(self):
+        """Sleep until the next reminder is due, then deliver everything due"""
+        while True:
+            due = self.scheduler.wait_for_due()
+            if due is None:
+                break
+            self.check({kind for _, kind in due})
+
+    def check(self, kinds=('advance', 'due')):
+        """Deliver and mark every reminder whose due or advance time has passed"""
+        advance_ids = []
+        due_ids = []
+        series = {}
+        try:
+            now = int(time.time())
+            if 'advance' in kinds and self.advance_seconds:
+                rows = self.db.query("""
+                    SELECT r.user_id, u.full_name, r.id, r.title, r.description, r.category
+                    FROM reminders r JOIN users u ON u.id = r.user_id
+                    WHERE r.status='pending' AND r.notified=0
+                    AND r.due_at > ? AND r.due_at <= ?
+                    AND r.advance_notified=0
+                    ORDER BY r.user_id, r.due_at
+                """, (now, now + self.advance_seconds))
+                advance_ids = self.dispatch(rows, True)
+                self.retry_refused(rows, advance_ids, 'advance')
+
+            if 'due' in kinds:
+                rows = self.db.query("""
+                    SELECT r.user_id, u.full_name, r.id, r.title, r.description, r.category,
+                           r.repeat_type, COALESCE(r.series_start, r.reminder_date || ' ' || r.reminder_time)
+                    FROM reminders r JOIN users u ON u.id = r.user_id
+                    WHERE r.status='pending' AND r.notified=0 AND r.due_at <= ?
+                    ORDER BY r.user_id, r.due_at
+                """, (now,))
+                series = {row[2]: row[6:] for row in rows if is_recurring(row[6])}
+                due_ids = self.dispatch(rows, False)
+                self.retry_refused(rows, due_ids, 'due')
+        except Exception as e:
+            print(f"Reminder check error: {e}")
+        finally:
+            self.mark_delivered(advance_ids, due_ids, series)
+
+    def dispatch(self, rows, is_advance_warning):
+        """Deliver rows grouped per user and return the delivered ids"""
+        delivered = []
+        for user_id, group in groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            user = {"id": user_id, "name": group[0][1]}
+            delivered.extend(self.deliver(user, [row[2:6] for row in group], is_advance_warning))
+        return delivered
+
+    def retry_refused(self, rows, delivered, kind):
+        """Reschedule the rows that deliver did not accept"""
+        refused = {row[2] for row in rows}.difference(delivered)
+        retry_at = time.time() + DELIVERY_RETRY_SECONDS
+        for reminder_id in refused:
+            self.scheduler.schedule((reminder_id, kind), retry_at)
+
+    def mark_delivered(self, advance_ids, due_ids, series=None):
+        """Record one tick's deliveries in a single transaction
+
+        series maps the ids of recurring reminders to (repeat_type,
+        series_start); those rows move to their next occurrence after now,
+        skipping any missed while the app was closed, and are rescheduled.
+        """
+        if not advance_ids and not due_ids:
+            return
+
+        try:
+            now = datetime.now()
+            finished = []
+            upcoming = []
+            for reminder_id in due_ids:
+                repeat_type, series_start = (series or {}).get(reminder_id, (None, None))
+                start = parse_series_start(series_start)
+                occurrence = next_occurrence(start, repeat_type, now) if start else None
+                if occurrence is None:
+                    finished.append((reminder_id,))
+                else:
+                    upcoming.append((occurrence.strftime('%Y-%m-%d'), occurrence.strftime('%H:%M'),
+                                     int(occurrence.timestamp()), reminder_id))
+
+            started = time.perf_counter()
+            with self.db.transaction() as cursor:
+                # V1 and V2 databases have no advance_notified column
+                if advance_ids:
+                    cursor.executemany("UPDATE reminders SET advance_notified=1 WHERE id=?",
+                                       [(reminder_id,) for reminder_id in advance_ids])
+                cursor.executemany("UPDATE reminders SET notified=1 WHERE id=?", finished)
+                if self.advance_seconds:
+                    cursor.executemany("""
+                        UPDATE reminders
+                        SET reminder_date=?, reminder_time=?, due_at=?, advance_notified=0
+                        WHERE id=?
+                    """, upcoming)
+                else:
+                    cursor.executemany("""
+                        UPDATE reminders SET reminder_date=?, reminder_time=?, due_at=? WHERE id=?
+                    """, upcoming)
+
+            if self.db.metrics is not None:
+                self.db.metrics.record('delivery', 'mark_delivered', time.perf_counter() - started,
+                                       len(advance_ids) + len(due_ids))
+
+            for _, _, due_at, reminder_id in upcoming:
+                self.schedule(reminder_id, due_at)
+        except Exception as e:
+            print(f"Delivery state update error: {e}")
+
+
+def due_timestamp(reminder_date, reminder_time):
+    """Convert stored 'YYYY-MM-DD' and 'HH:MM' strings to a local epoch timestamp"""
+    try:
+        return int(datetime.strptime(f"{reminder_date} {reminder_time}", '%Y-%m-%d %H:%M').timestamp())
+    except (TypeError, ValueError):
+        return None
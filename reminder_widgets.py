@@ -0,0 +1,222 @@
+import time
+import tkinter as tk
+
+
+class PagedTreeview:
+    """Shows a bounded window of rows in a ttk.Treeview, paging as the user scrolls
+
+    fetch_page(key, limit, forward) must return up to limit rows in display
+    order that come after key (forward=True, key=None for the first page) or
+    the rows just before key in reverse display order (forward=False).
+    key_of(row) returns the row's keyset pagination key and iid_of(row) the
+    Treeview item id. At most max_pages pages are kept in the widget; pages
+    scrolled far out of view are dropped and re-fetched on the way back.
+    refresh() re-reads the loaded window and only touches rows that changed.
+    """
+
+    def __init__(self, tree, fetch_page, key_of, iid_of, scrollbar=None,
+                 page_size=100, max_pages=3):
+        self.tree = tree
+        self.fetch_page = fetch_page
+        self.key_of = key_of
+        self.iid_of = iid_of
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.rows = {}
+        self.more_above = False
+        self.more_below = False
+        self._loading = False
+
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    def reset(self):
+        """Clear the widget and load the first page"""
+        self.tree.delete(*self.tree.get_children())
+        self.rows = {}
+        self.more_above = False
+        rows = self.fetch_page(None, self.page_size, True)
+        self.more_below = len(rows) == self.page_size
+        for row in rows:
+            self._insert(tk.END, row)
+        self.tree.yview_moveto(0)
+
+    def refresh(self):
+        """Re-read the loaded window and apply only the differences"""
+        children = self.tree.get_children()
+        if not children:
+            self.reset()
+            return
+
+        # Re-fetch from just before the first loaded row, so rows inserted
+        # at the top of the window show up as well
+        anchor = None
+        if self.more_above:
+            previous = self.fetch_page(self.key_of(self.rows[children[0]]), 1, False)
+            if previous:
+                anchor = self.key_of(previous[0])
+            else:
+                self.more_above = False
+        limit = max(len(children), self.page_size)
+        rows = self.fetch_page(anchor, limit, True)
+        self.more_below = len(rows) == limit
+        self.sync(rows)
+
+    def sync(self, rows):
+        """Make the widget show rows, inserting, updating, moving or removing by iid"""
+        wanted = {self.iid_of(row): row for row in rows}
+        stale = [iid for iid in self.tree.get_children() if iid not in wanted]
+        if stale:
+            self._remove(stale)
+
+        current = list(self.tree.get_children())
+        for index, (iid, row) in enumerate(wanted.items()):
+            if index < len(current) and current[index] == iid:
+                if self.rows[iid] != row:
+                    self.update_row(row)
+                continue
+            if iid in self.rows:
+                current.remove(iid)
+                self.tree.move(iid, "", index)
+                if self.rows[iid] != row:
+                    self.update_row(row)
+            else:
+                self._insert(index, row)
+            current.insert(index, iid)
+
+    def update_row(self, row):
+        """Replace the values of one loaded row in place"""
+        iid = self.iid_of(row)
+        if iid in self.rows:
+            self.rows[iid] = row
+            self.tree.item(iid, values=row)
+
+    def remove_row(self, iid):
+        """Remove one loaded row"""
+        if iid in self.rows:
+            self._remove([iid])
+
+    def _insert(self, index, row):
+        iid = self.iid_of(row)
+        self.rows[iid] = row
+        self.tree.insert("", index, iid=iid, values=row)
+
+    def _remove(self, iids):
+        for iid in iids:
+            self.rows.pop(iid, None)
+        self.tree.delete(*iids)
+
+    def _on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if self._loading:
+            return
+        if float(last) > 0.9 and self.more_below:
+            self._loading = True
+            self.tree.after_idle(self.load_below)
+        elif float(first) < 0.1 and self.more_above:
+            self._loading = True
+            self.tree.after_idle(self.load_above)
+
+    def load_below(self):
+        """Append the next page and drop rows far above the view"""
+        try:
+            children = self.tree.get_children()
+            if not children:
+                return
+            rows = self.fetch_page(self.key_of(self.rows[children[-1]]), self.page_size, True)
+            self.more_below = len(rows) == self.page_size
+            if not rows:
+                return
+
+            top = round(self.tree.yview()[0] * len(children))
+            for row in rows:
+                self._insert(tk.END, row)
+
+            children = self.tree.get_children()
+            excess = len(children) - self.max_rows
+            if excess > 0:
+                self._remove(children[:excess])
+                self.more_above = True
+                top = max(top - excess, 0)
+            self.tree.yview_moveto(top / len(self.tree.get_children()))
+        finally:
+            self._loading = False
+
+    def load_above(self):
+        """Prepend the previous page and drop rows far below the view"""
+        try:
+            children = self.tree.get_children()
+            if not children:
+                return
+            rows = self.fetch_page(self.key_of(self.rows[children[0]]), self.page_size, False)
+            self.more_above = len(rows) == self.page_size
+            if not rows:
+                return
+
+            top = round(self.tree.yview()[0] * len(children))
+            for row in rows:
+                self._insert(0, row)
+
+            children = self.tree.get_children()
+            excess = len(children) - self.max_rows
+            if excess > 0:
+                self._remove(children[-excess:])
+                self.more_below = True
+            self.tree.yview_moveto((top + len(rows)) / len(self.tree.get_children()))
+        finally:
+            self._loading = False
+
+
+class ViewRegistry:
+    """Builds each screen once and switches screens without destroying widgets
+
+    build(frame) creates a screen's widgets inside frame and returns a
+    refresh() callable that reloads its data; refresh runs every time the
+    screen is shown, including the first time. Builds and refreshes are
+    timed when a reminder_metrics.Instrumentation is given as metrics.
+    """
+
+    def __init__(self, container, metrics=None):
+        self.container = container
+        self.metrics = metrics
+        self.builders = {}
+        self.frames = {}
+        self.refreshers = {}
+        self.current = None
+
+    def register(self, name, build):
+        self.builders[name] = build
+
+    def show(self, name):
+        """Show a screen, building it on first use and refreshing its data"""
+        if name not in self.frames:
+            frame = tk.Frame(self.container, bg=self.container.cget("bg"))
+            self.frames[name] = frame
+            started = time.perf_counter()
+            self.refreshers[name] = self.builders[name](frame)
+            if self.metrics is not None:
+                self.metrics.record('screen', f"{name} build", time.perf_counter() - started)
+
+        frame = self.frames[name]
+        if self.current is not frame:
+            if self.current is not None:
+                self.current.pack_forget()
+            frame.pack(fill=tk.BOTH, expand=True)
+            frame.tkraise()
+            self.current = frame
+
+        refresh = self.refreshers[name]
+        if refresh is not None:
+            started = time.perf_counter()
+            refresh()
+            if self.metrics is not None:
+                self.metrics.record('screen', f"{name} refresh", time.perf_counter() - started)
+
+
+def report_startup_time(root, started):
+    """Print the time from started (a perf_counter value) until the window is drawn"""
+    def report():
+        print(f"Startup: window ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+    # Idle callbacks run after the pending redraws of the first frame
+    root.after_idle(report)
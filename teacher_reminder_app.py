@@ -1,15 +1,21 @@
+import time
+STARTED_AT = time.perf_counter()
+import sys
 import tkinter as tk
 from tkinter import messagebox, ttk
 import sqlite3
 import datetime
 import threading
-import time
-from plyer import notification
+from reminder_delivery import DigestCoalescer, format_digest, show_notification
+from reminder_widgets import PagedTreeview, report_startup_time
+
+DB_PATH = "reminders.db"
+TIME_FORMAT = "%Y-%m-%d %H:%M"
 
 # -----------------------------
 # DATABASE SETUP
 # -----------------------------
-conn = sqlite3.connect("reminders.db")
+conn = sqlite3.connect(DB_PATH)
 cursor = conn.cursor()
 cursor.execute("""
     CREATE TABLE IF NOT EXISTS reminders (
@@ -19,8 +25,18 @@ cursor.execute("""
         remind_time TEXT NOT NULL
     )
 """)
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_reminders_remind_time ON reminders (remind_time)")
+# The checker's progress: every reminder due up to the watermark was delivered
+cursor.execute("""
+    CREATE TABLE IF NOT EXISTS checker_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        watermark TEXT NOT NULL
+    )
+""")
 conn.commit()
 
+PAGE_SIZE = 100
+
 # -----------------------------
 # FUNCTIONS
 # -----------------------------
@@ -34,16 +50,26 @@ def add_reminder():
         return
 
     try:
-        datetime.datetime.strptime(remind_time, "%Y-%m-%d %H:%M")
+        # Stored zero-padded, because the checker compares times as text
+        remind_time = datetime.datetime.strptime(remind_time.strip(), TIME_FORMAT).strftime(TIME_FORMAT)
     except ValueError:
         messagebox.showerror("Error", "Invalid date/time format. Use YYYY-MM-DD HH:MM.")
         return
 
+    # A write transaction, so the checker cannot move the watermark past
+    # this reminder between reading it here and the insert
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("SELECT watermark FROM checker_state WHERE id = 1")
+    row = cursor.fetchone()
     cursor.execute("INSERT INTO reminders (title, description, remind_time) VALUES (?, ?, ?)",
                    (title, desc, remind_time))
+    reminder_id = cursor.lastrowid
     conn.commit()
+    if row and remind_time <= row[0]:
+        # The checker is already past this minute, so deliver it now
+        digests.add({"id": None}, [(reminder_id, title, desc, None)])
     messagebox.showinfo("Success", "Reminder added successfully!")
-    load_reminders()
+    reminder_pages.refresh()
     title_entry.delete(0, tk.END)
     desc_entry.delete("1.0", tk.END)
     time_entry.delete(0, tk.END)
@@ -58,29 +84,73 @@ def delete_reminder():
     reminder_id = item["values"][0]
     cursor.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
     conn.commit()
-    load_reminders()
+    reminder_pages.remove_row(selected[0])
 
 
 def load_reminders():
-    for row in reminder_table.get_children():
-        reminder_table.delete(row)
-    cursor.execute("SELECT * FROM reminders")
-    for row in cursor.fetchall():
-        reminder_table.insert("", "end", values=row)
+    reminder_pages.reset()
+
+
+def fetch_reminders_page(after_id, limit, forward):
+    # Keyset pagination on id, so each page is an index range scan
+    if after_id is None:
+        cursor.execute("SELECT * FROM reminders ORDER BY id LIMIT ?", (limit,))
+    elif forward:
+        cursor.execute("SELECT * FROM reminders WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+    else:
+        cursor.execute("SELECT * FROM reminders WHERE id < ? ORDER BY id DESC LIMIT ?", (after_id, limit))
+    return cursor.fetchall()
+
+
+def show_reminder_digest(user, reminders, is_advance_warning):
+    if len(reminders) == 1:
+        _, title, description, _ = reminders[0]
+        show_notification(title=f"Reminder: {title}", message=description or "No description", timeout=10)
+    else:
+        show_notification(title=f"{len(reminders)} reminders due", message=format_digest(reminders), timeout=10)
+
+
+# Reminders due together are shown as one digest, at most one popup a minute
+digests = DigestCoalescer(show_reminder_digest, window_seconds=60)
+
+
+def check_due_reminders(check_conn, now):
+    # Deliver everything due after the stored watermark up to now, then move
+    # the watermark on. Each minute falls in exactly one check, however late
+    # the thread wakes up or however long the laptop slept
+    now_str = now.strftime(TIME_FORMAT)
+    check_cursor = check_conn.cursor()
+    # Read and move the watermark in one write transaction, in step with add_reminder
+    check_cursor.execute("BEGIN IMMEDIATE")
+    check_cursor.execute("SELECT watermark FROM checker_state WHERE id = 1")
+    row = check_cursor.fetchone()
+    watermark = row[0] if row else (now - datetime.timedelta(minutes=1)).strftime(TIME_FORMAT)
+    if now_str <= watermark:
+        check_conn.rollback()
+        return 0
+
+    # An index range scan: the cost follows the number of due reminders
+    check_cursor.execute("""SELECT id, title, description FROM reminders
+                            WHERE remind_time > ? AND remind_time <= ? ORDER BY remind_time""",
+                         (watermark, now_str))
+    reminders = check_cursor.fetchall()
+    check_cursor.execute("INSERT OR REPLACE INTO checker_state (id, watermark) VALUES (1, ?)", (now_str,))
+    check_conn.commit()
+    # Shown after the commit, so a slow notification never holds the write lock
+    digests.add({"id": None}, [(reminder[0], reminder[1], reminder[2], None) for reminder in reminders])
+    return len(reminders)
 
 
 def check_reminders():
+    # SQLite connections belong to the thread that opened them
+    check_conn = sqlite3.connect(DB_PATH)
     while True:
-        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-        cursor.execute("SELECT * FROM reminders WHERE remind_time = ?", (now,))
-        reminders = cursor.fetchall()
-        for reminder in reminders:
-            notification.notify(
-                title=f"Reminder: {reminder[1]}",
-                message=reminder[2] or "No description",
-                timeout=10
-            )
-        time.sleep(60)  # Check every 60 seconds
+        try:
+            check_due_reminders(check_conn, datetime.datetime.now())
+        except sqlite3.Error as e:
+            print(f"Reminder check error: {e}")
+        # Wake just after the next minute starts
+        time.sleep(61 - datetime.datetime.now().second)
 
 
 # -----------------------------
@@ -118,6 +188,9 @@ for col in columns:
     reminder_table.heading(col, text=col)
     reminder_table.column(col, width=150)
 reminder_table.pack(pady=10)
+reminder_pages = PagedTreeview(reminder_table, fetch_reminders_page,
+                               key_of=lambda row: row[0], iid_of=lambda row: str(row[0]),
+                               page_size=PAGE_SIZE)
 
 delete_btn = tk.Button(app, text="Delete Selected", command=delete_reminder, bg="#E53935", fg="white", width=15)
 delete_btn.pack(pady=5)
@@ -130,4 +203,8 @@ load_reminders()
 thread = threading.Thread(target=check_reminders, daemon=True)
 thread.start()
 
+if "--startup-timing" in sys.argv:
+    report_startup_time(app, STARTED_AT)
 app.mainloop()
+# Show any digest still held back rather than lose it
+digests.stop()